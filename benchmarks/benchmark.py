@@ -0,0 +1,247 @@
+"""Throughput benchmarks of tap-monday against the local mock server.
+
+Each scenario runs the tap in a subprocess against a synthetic account and
+reports records/sec, requests, wall time and peak RSS, per stream where it
+applies. Results can be saved and compared to catch regressions:
+
+    python benchmarks/benchmark.py --preset large --output baseline.json
+    python benchmarks/benchmark.py --preset large --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, replace
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tap_monday.tests.mock_server import MockMondayServer, MockScale  # noqa: E402
+
+PRESETS = {
+    "small": MockScale(boards=50, items_per_board=20, columns_per_board=5),
+    # 5k boards and 500k column values
+    "large": MockScale(boards=5000, items_per_board=10, columns_per_board=10),
+}
+
+SCENARIOS: Dict[str, dict] = {
+    "baseline": {},
+    "batched": {
+        "board_batch_size": 25,
+        "batch_column_values": True,
+        "column_value_limit": 100,
+    },
+    "combined": {"combined_board_fetch": True},
+    "adaptive": {"adaptive_board_limit": True, "max_board_limit": 100},
+    "workers": {"max_workers": 8},
+    "bounded": {"max_workers": 8, "bounded_memory": True},
+    "streaming": {
+        "board_batch_size": 25,
+        "batch_column_values": True,
+        "column_value_limit": 100,
+        "stream_responses": True,
+    },
+    "fast_serialization": {
+        "board_batch_size": 25,
+        "batch_column_values": True,
+        "column_value_limit": 100,
+        "fast_serialization": True,
+    },
+    "paced": {
+        "board_batch_size": 25,
+        "batch_column_values": True,
+        "column_value_limit": 100,
+        "complexity_rate_limit": True,
+    },
+    # With --complexity-budget, each token gets a budget of its own
+    "tokens": {
+        "board_batch_size": 25,
+        "batch_column_values": True,
+        "column_value_limit": 100,
+        "complexity_rate_limit": True,
+        "auth_tokens": ["benchmark-2", "benchmark-3", "benchmark-4"],
+    },
+}
+
+# Queries of the tap by the stream they are sent for
+QUERY_STREAMS = {
+    "Boards": "boards",
+    "Groups": "groups",
+    "Columns": "columns",
+    "Items": "items",
+    "UpdatedItems": "items",
+    "ItemActivity": "items",
+    "ColumnValues": "column_values",
+}
+
+RECORD_PREFIX = '{"type": "RECORD", "stream": "'
+
+TAP_CLI = "from tap_monday.tap import TapMonday; TapMonday.cli()"
+
+
+def run_scenario(name: str, settings: dict, scale: MockScale) -> dict:
+    """Run the tap for a scenario and return its measurements."""
+    with MockMondayServer(scale) as server, tempfile.TemporaryDirectory() as tmp:
+        config = {
+            "api_url": server.url,
+            "auth_token": "benchmark",
+            "board_limit": 50,
+            "item_limit": 100,
+            **settings,
+        }
+        config_path = Path(tmp) / "config.json"
+        config_path.write_text(json.dumps(config))
+
+        streams: Dict[str, dict] = {}
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-c", TAP_CLI, "--config", str(config_path)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            cwd=Path(__file__).resolve().parents[1],
+        )
+        for line in process.stdout or []:
+            if not line.startswith(RECORD_PREFIX):
+                continue
+            stream = line.split('"', 8)[7]
+            now = time.perf_counter()
+            stats = streams.setdefault(stream, {"records": 0, "first": now})
+            stats["records"] += 1
+            stats["last"] = now
+
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = (
+            os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        )
+        wall = time.perf_counter() - started
+
+    requests: Dict[str, int] = {}
+    for query, count in server.account.requests.items():
+        stream = QUERY_STREAMS.get(query, query)
+        requests[stream] = requests.get(stream, 0) + count
+
+    per_stream = {}
+    for stream, stats in sorted(streams.items()):
+        span = max(stats["last"] - stats["first"], 1e-9)
+        per_stream[stream] = {
+            "records": stats["records"],
+            "requests": requests.get(stream, 0),
+            "seconds": round(span, 3),
+            "records_per_sec": round(stats["records"] / span, 1),
+        }
+
+    return {
+        "scenario": name,
+        "exit_code": process.returncode,
+        "wall_seconds": round(wall, 3),
+        # Kilobytes on Linux
+        "peak_rss_mb": round(rusage.ru_maxrss / 1024, 1),
+        "requests": sum(requests.values()),
+        "records": sum(stats["records"] for stats in streams.values()),
+        "streams": per_stream,
+    }
+
+
+def print_result(result: dict) -> None:
+    """Print the measurements of a scenario as a table."""
+    print(
+        f"\n{result['scenario']}: {result['wall_seconds']}s wall, "
+        f"{result['peak_rss_mb']} MB peak RSS, {result['requests']} requests, "
+        f"{result['records']} records, exit code {result['exit_code']}"
+    )
+    print(
+        f"  {'stream':<15}{'records':>10}{'requests':>10}{'seconds':>10}{'rec/s':>12}"
+    )
+    for stream, stats in result["streams"].items():
+        print(
+            f"  {stream:<15}{stats['records']:>10}{stats['requests']:>10}"
+            f"{stats['seconds']:>10}{stats['records_per_sec']:>12}"
+        )
+
+
+def regressions(results: List[dict], baseline: List[dict], tolerance: float) -> list:
+    """Return the measurements that got worse than the baseline by tolerance."""
+    found = []
+    previous = {result["scenario"]: result for result in baseline}
+    for result in results:
+        before = previous.get(result["scenario"])
+        if before is None:
+            continue
+        for metric in ("wall_seconds", "peak_rss_mb", "requests"):
+            if result[metric] > before[metric] * (1 + tolerance):
+                found.append(
+                    f"{result['scenario']} {metric}: "
+                    f"{before[metric]} -> {result[metric]}"
+                )
+        if result["records"] != before["records"]:
+            found.append(
+                f"{result['scenario']} records: "
+                f"{before['records']} -> {result['records']}"
+            )
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--boards", type=int, help="Override the preset")
+    parser.add_argument("--items-per-board", type=int, help="Override the preset")
+    parser.add_argument("--columns-per-board", type=int, help="Override the preset")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds/request")
+    parser.add_argument(
+        "--complexity-budget", type=int, default=0, help="Budget per period"
+    )
+    parser.add_argument("--budget-period", type=float, default=60.0)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="Scenario to run, all by default",
+    )
+    parser.add_argument("--output", help="Save the results to a JSON file")
+    parser.add_argument("--compare", help="Compare with results saved before")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    overrides = {
+        "boards": args.boards,
+        "items_per_board": args.items_per_board,
+        "columns_per_board": args.columns_per_board,
+    }
+    scale = replace(
+        PRESETS[args.preset],
+        latency=args.latency,
+        complexity_budget=args.complexity_budget,
+        budget_period=args.budget_period,
+        **{key: value for key, value in overrides.items() if value is not None},
+    )
+    print(f"Scale: {asdict(scale)}, {scale.column_values} column values")
+
+    results = []
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(name, SCENARIOS[name], scale)
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        found = regressions(results, baseline, args.tolerance)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        return 1 if found else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
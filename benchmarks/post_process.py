@@ -0,0 +1,76 @@
+"""Microbenchmark of ColumnValuesStream.post_process throughput.
+
+Runs post_process over synthetic column values, with tapped_at formatted
+for every record as before, once per second, and once per run:
+
+    python benchmarks/post_process.py --records 200000
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tap_monday.tap import TapMonday  # noqa: E402
+
+CONFIG = {"api_url": "https://api.monday.com/v2", "auth_token": "benchmark"}
+
+
+def per_record_tapped_at() -> str:
+    """Format the current time for every record, as tapped_at used to."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def column_values(count: int) -> List[dict]:
+    """Return rows as parse_response yields them."""
+    return [
+        {
+            "id": f"text_{index % 10}",
+            "text": f"Value {index}",
+            "value": f'"Value {index}"',
+            "additional_info": None,
+            "title": f"Column {index % 10}",
+            "type": "text",
+        }
+        for index in range(count)
+    ]
+
+
+def records_per_second(
+    config: dict, rows: List[dict], tapped_at: Optional[Callable[[], str]] = None
+) -> float:
+    """Return the rows post_process handles per second."""
+    stream = TapMonday(config=config).streams["column_values"]
+    if tapped_at is not None:
+        setattr(stream, "tapped_at", tapped_at)
+    context = {"item_id": 1}
+    started = time.perf_counter()
+    for row in rows:
+        stream.post_process(dict(row), context)
+    return len(rows) / (time.perf_counter() - started)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the microbenchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    rows = column_values(args.records)
+    results: Dict[str, float] = {
+        "per record": records_per_second(CONFIG, rows, per_record_tapped_at),
+        "per second": records_per_second(CONFIG, rows),
+        "per run": records_per_second({**CONFIG, "tapped_at_per_run": True}, rows),
+    }
+    for name, rate in results.items():
+        gain = rate / results["per record"]
+        print(f"tapped_at {name:<10} {rate:>12,.0f} records/s  {gain:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""BATCH messages, records written to gzip JSONL files instead of stdout."""
+
+import gzip
+import json
+import sys
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional, TextIO
+from urllib.parse import urlparse
+
+ENCODING = {"format": "jsonl", "compression": "gzip"}
+
+
+class _Batch:
+    """A file of records of a stream being written."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.file = gzip.GzipFile(path, "wb")
+        self.rows = 0
+        self.bytes = 0
+
+
+class BatchWriter:
+    """Writes records to gzip JSONL files per stream, announced in BATCH messages.
+
+    A stream's file is rolled over once it holds max_rows records or
+    max_bytes uncompressed bytes. The files of all streams are then closed
+    and announced together, and the STATE message deferred by `write_state`
+    while records were in files not announced yet is written after them, so
+    no state runs ahead of the records a target got.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        prefix: str = "",
+        max_rows: int = 1000000,
+        max_bytes: int = 100 * 1024 * 1024,
+        output: Optional[TextIO] = None,
+    ) -> None:
+        """Create the directory the files are written to, if needed."""
+        if root.startswith("file://"):
+            root = urlparse(root).path
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.output = output
+        self._batches: Dict[str, _Batch] = {}
+        self._deferred_state: Optional[Callable[[], None]] = None
+
+    def write(self, stream: str, record: dict) -> None:
+        """Write a record to the current file of its stream."""
+        batch = self._batches.get(stream)
+        if batch is None:
+            name = f"{self.prefix}{stream}-{uuid.uuid4()}.json.gz"
+            batch = self._batches[stream] = _Batch(self.root / name)
+
+        line = (json.dumps(record, default=str) + "\n").encode()
+        batch.file.write(line)
+        batch.rows += 1
+        batch.bytes += len(line)
+        if batch.rows >= self.max_rows or batch.bytes >= self.max_bytes:
+            self.close()
+
+    def write_state(self, write: Callable[[], None]) -> None:
+        """Write a STATE message with write, once the records so far are announced."""
+        if self._batches:
+            self._deferred_state = write
+        else:
+            write()
+
+    def close(self) -> None:
+        """Close the open files and write their BATCH messages, then the state."""
+        output = self.output or sys.stdout
+        for stream, batch in self._batches.items():
+            batch.file.close()
+            message = {
+                "type": "BATCH",
+                "stream": stream,
+                "encoding": ENCODING,
+                "manifest": [batch.path.resolve().as_uri()],
+            }
+            output.write(json.dumps(message) + "\n")
+        output.flush()
+        self._batches = {}
+
+        if self._deferred_state is not None:
+            write, self._deferred_state = self._deferred_state, None
+            write()
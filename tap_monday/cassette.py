@@ -0,0 +1,131 @@
+"""Recording API responses to a directory, and replaying them offline."""
+
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Mapping, Optional, Union, cast
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+def request_key(body: Union[bytes, str, None]) -> str:
+    """Return the key of a GraphQL request, a hash of its query and variables."""
+    payload = json.loads(body or "{}")
+    content = json.dumps(
+        {"query": payload.get("query"), "variables": payload.get("variables")},
+        sort_keys=True,
+    )
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class CassetteAdapter(BaseAdapter):
+    """Adapter saving responses to a directory, or serving them from it.
+
+    In record mode, requests are sent with the wrapped adapter and each
+    successful response without GraphQL errors is saved, gzipped and keyed
+    by the query and variables. In replay mode, nothing is sent and the
+    saved responses are served. A request that wasn't recorded fails with
+    FileNotFoundError.
+    """
+
+    def __init__(
+        self, path: str, mode: str, adapter: Optional[BaseAdapter] = None
+    ) -> None:
+        """Create the directory of the recordings, if needed."""
+        super().__init__()
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        if mode == RECORD and adapter is None:
+            raise ValueError("Recording needs an adapter to send requests with")
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.adapter = adapter
+
+    def send(
+        self, request: requests.PreparedRequest, *args: Any, **kwargs: Any
+    ) -> requests.Response:
+        """Serve the recorded response, or send the request and record it."""
+        entry_path = self.path / f"{request_key(request.body)}.json.gz"
+        if self.mode == REPLAY:
+            return self.replay(request, entry_path)
+
+        response = cast(BaseAdapter, self.adapter).send(request, *args, **kwargs)
+        if response.status_code == 200 and "errors" not in response.json():
+            self.record(request, response, entry_path)
+        return response
+
+    def record(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        entry_path: Path,
+    ) -> None:
+        """Save a response, replacing the file only once it is complete."""
+        entry = {
+            "request": json.loads(request.body or "{}"),
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "body": response.content.decode("utf-8"),
+        }
+        temp_path = entry_path.with_name(f"{entry_path.name}.{uuid.uuid4()}.tmp")
+        with gzip.open(temp_path, "wt") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temp_path, entry_path)
+
+    def replay(
+        self, request: requests.PreparedRequest, entry_path: Path
+    ) -> requests.Response:
+        """Return the response recorded for a request."""
+        if not entry_path.exists():
+            raise FileNotFoundError(
+                f"No response recorded for the request in {entry_path}"
+            )
+
+        with gzip.open(entry_path, "rt") as entry_file:
+            entry = json.load(entry_file)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = "utf-8"
+        # Already read, so streaming it and closing it leave out the raw body
+        response._content = entry["body"].encode("utf-8")
+        setattr(response, "_content_consumed", True)
+        response.url = request.url or ""
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        """Close the connections of the wrapped adapter."""
+        if self.adapter is not None:
+            self.adapter.close()
+
+
+def replaying(config: Mapping[str, Any]) -> bool:
+    """Return whether responses are replayed instead of requested."""
+    return bool(config.get("cassette_path")) and (
+        (config.get("cassette_mode") or REPLAY) == REPLAY
+    )
+
+
+def cassette_adapter(
+    config: Mapping[str, Any], adapter: BaseAdapter
+) -> Optional[CassetteAdapter]:
+    """Return the adapter recording or replaying responses, if configured."""
+    if not config.get("cassette_path"):
+        return None
+
+    return CassetteAdapter(
+        config["cassette_path"], config.get("cassette_mode") or REPLAY, adapter
+    )
@@ -1,19 +1,122 @@
 """GraphQL client handling, including MondayStream base class."""
 
+import itertools
+import json
+import re
+import threading
+import time
 import requests
-from typing import Any, Optional, Callable
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import (
+    Any,
+    Deque,
+    Optional,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    cast,
+)
 
 # from typing import Any, Optional, Iterable, Callable, Generator
 import backoff
 from datetime import datetime, timezone
 
+from requests.adapters import BaseAdapter
 from singer_sdk.streams import GraphQLStream
 from singer_sdk.exceptions import FatalAPIError, RetriableAPIError
 
+from tap_monday.batch import BatchWriter
+from tap_monday.cassette import replaying
+from tap_monday.column_cache import ColumnCache
+from tap_monday.json_stream import iter_json_items
+from tap_monday.memory import MemoryBudget
+from tap_monday.metrics import RequestMetrics
+from tap_monday.record_hashes import RecordHashes
+from tap_monday.serialization import RecordWriter
+from tap_monday.rate_limit import (
+    COMPLEXITY_FIELD,
+    RESET_IN_SECONDS_RE,
+    ComplexityRateLimiter,
+    TokenPool,
+    retry_after_seconds,
+)
+
+# Bytes of a streamed response body read at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Bodies with records start with data, error bodies with error fields
+DATA_FIRST_RE = re.compile(rb'\s*{\s*"data"')
+
+# Field of tombstone records, records that are gone since the last run
+DELETED_AT_FIELD = "_sdc_deleted_at"
+
+TAPPED_AT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def build_selection_set(fields: List[str]) -> str:
+    """Form a GraphQL selection set from dot-separated field paths."""
+    tree: dict = {}
+    for field in fields:
+        node = tree
+        for name in field.split("."):
+            node = node.setdefault(name, {})
+
+    def render(node: dict) -> str:
+        return " ".join(
+            name + (" { " + render(children) + " }" if children else "")
+            for name, children in node.items()
+        )
+
+    return render(tree)
+
+
+def iter_nested(parent: dict, path: Sequence[str]) -> Iterator[Tuple[dict, Any]]:
+    """Yield the elements of the arrays at a path of keys with their parents."""
+    value = parent.get(path[0]) or []
+    if len(path) == 1:
+        for element in value:
+            yield parent, element
+        return
+
+    for child in value if isinstance(value, list) else [value]:
+        yield from iter_nested(child, path[1:])
+
 
 class MondayStream(GraphQLStream):
     """Monday stream class."""
 
+    # Context key a child stream is queried by, e.g. "item_id". Child streams
+    # that can be queried for many parents at once are synced with a batch
+    # context holding a list of these values under the plural key.
+    batch_context_key: Optional[str] = None
+
+    # GraphQL field of each schema property that comes from the API, nested
+    # fields separated by dots. Only selected properties are queried.
+    property_fields: Dict[str, str] = {}
+
+    # Full-table streams that only sync records whose content changed since
+    # the last run when change detection is enabled
+    detect_changes = False
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the stream and its buffers of batched child contexts."""
+        super().__init__(*args, **kwargs)
+        if self.detect_changes and self.config.get("emit_tombstones"):
+            self._schema["properties"][DELETED_AT_FIELD] = {
+                "type": ["string", "null"],
+                "format": "date-time",
+            }
+        self._child_batches: Dict[str, List[dict]] = {}
+        self._preloaded_records: Dict[str, List[dict]] = {}
+        self._prefetched_records: Dict[str, Future] = {}
+        self._thread_local = threading.local()
+        self._tapped_at: Tuple[int, str] = (0, "")
+
     @property
     def url_base(self) -> str:
         """Return the API URL root, configurable via tap settings."""
@@ -28,33 +131,568 @@ class MondayStream(GraphQLStream):
         headers["User-Agent"] = "Meltano"
         return headers
 
+    @property
+    def requests_session(self) -> requests.Session:
+        """Return a session of the current thread, sessions aren't thread-safe."""
+        if threading.current_thread() is threading.main_thread():
+            session = super().requests_session
+        else:
+            if not hasattr(self._thread_local, "session"):
+                self._thread_local.session = requests.Session()
+            session = self._thread_local.session
+
+        adapter = self.http_adapter
+        if adapter is not None and session.adapters.get("https://") is not adapter:
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        # Streamed bodies are read as the records are parsed
+        session.stream = self.stream_responses
+        return session
+
+    @property
+    def stream_responses(self) -> bool:
+        """Return whether to parse records while response bodies are read."""
+        return bool(
+            self.config.get("stream_responses") or self.config.get("bounded_memory")
+        )
+
+    @property
+    def http_adapter(self) -> Optional[BaseAdapter]:
+        """Return the adapter pooling the connections of all sessions."""
+        return getattr(self._tap, "http_adapter", None)
+
+    @property
+    # The SDK types it as int, requests waits for fractions of seconds as well
+    def timeout(self) -> float:  # type: ignore[override]
+        """Return the seconds to wait for a response."""
+        return float(self.config["http_read_timeout"])
+
+    @property
+    def worker_pool(self) -> Optional[Executor]:
+        """Return the pool fetching child records ahead, None if disabled."""
+        return getattr(self._tap, "worker_pool", None)
+
+    @property
+    def rate_limiter(self) -> Optional[ComplexityRateLimiter]:
+        """Return the complexity budget limiter shared by all streams, if enabled."""
+        return getattr(self._tap, "rate_limiter", None)
+
+    @property
+    def token_pool(self) -> Optional[TokenPool]:
+        """Return the tokens requests take turns with, if there are several."""
+        return getattr(self._tap, "token_pool", None)
+
+    @property
+    def column_cache(self) -> Optional[ColumnCache]:
+        """Return the cache of column definitions, if enabled."""
+        return getattr(self._tap, "column_cache", None)
+
+    @property
+    def record_hashes(self) -> Optional[RecordHashes]:
+        """Return the content hashes of records, if change detection is enabled."""
+        return getattr(self._tap, "record_hashes", None)
+
+    @property
+    def request_metrics(self) -> Optional[RequestMetrics]:
+        """Return the metrics of all requests of the run."""
+        return getattr(self._tap, "request_metrics", None)
+
+    @property
+    def record_writer(self) -> Optional[RecordWriter]:
+        """Return the writer buffering RECORD messages, if fast serialization is on."""
+        return getattr(self._tap, "record_writer", None)
+
+    @property
+    def batch_writer(self) -> Optional[BatchWriter]:
+        """Return the writer of records to batch files, if enabled."""
+        return getattr(self._tap, "batch_writer", None)
+
+    def _write_record_message(self, record: dict) -> None:
+        """Write out a RECORD message, buffered with fast serialization."""
+        if self.batch_writer is not None:
+            for record_message in self._generate_record_messages(record):
+                self.batch_writer.write(record_message.stream, record_message.record)
+            return
+
+        if self.record_writer is None:
+            super()._write_record_message(record)
+            return
+
+        for record_message in self._generate_record_messages(record):
+            self.record_writer.write(record_message)
+
+    def _write_schema_message(self) -> None:
+        """Write out a SCHEMA message after the RECORD messages buffered."""
+        if self.record_writer is not None:
+            self.record_writer.flush()
+        super()._write_schema_message()
+
+    def _write_state_message(self) -> None:
+        """Write out a STATE message after the RECORD messages buffered."""
+        if self.record_writer is not None:
+            self.record_writer.flush()
+        if self.batch_writer is not None:
+            # Held back until the batches of the records so far are announced
+            self.batch_writer.write_state(super()._write_state_message)
+            return
+
+        super()._write_state_message()
+
+    @property
+    def memory_budget(self) -> Optional[MemoryBudget]:
+        """Return the budget of records fetched ahead, if memory is bounded."""
+        return getattr(self._tap, "memory_budget", None)
+
+    @property
+    def page_size(self) -> Optional[int]:
+        """Return the number of records per page, None if not paginated."""
+        return None
+        # Most objects are queried by parent IDs without pagination
+
+    def response_json(self, response: requests.Response) -> dict:
+        """Return the parsed body of the response, parsing it only once."""
+        if not hasattr(response, "_parsed_json"):
+            setattr(response, "_parsed_json", response.json())
+        return cast(dict, getattr(response, "_parsed_json"))
+
+    def response_errors(self, response: requests.Response) -> List[dict]:
+        """Return the errors in the body of the response.
+
+        A streamed body is only parsed up front when it does not start with
+        data, as error bodies are small.
+        """
+        if hasattr(response, "_body_chunks"):
+            return []
+
+        if self.stream_responses and not hasattr(response, "_parsed_json"):
+            chunks = response.iter_content(STREAM_CHUNK_SIZE)
+            head = next(chunks, b"")
+            if DATA_FIRST_RE.match(head):
+                setattr(response, "_body_chunks", itertools.chain([head], chunks))
+                return []
+
+            setattr(response, "_parsed_json", json.loads(head + b"".join(chunks)))
+
+        return self.response_json(response).get("errors") or []
+
+    def check_response_data(
+        self, root: dict, limiter: Optional[ComplexityRateLimiter] = None
+    ) -> None:
+        """Raise if a parsed body holds errors or no data.
+
+        Otherwise a failed query would look like a parent without records.
+        An exhausted budget is retriable, and holds back the limiter until
+        it resets.
+        """
+        errors = root.get("errors") or []
+        if not errors and root.get("data") is not None:
+            return
+
+        for error in errors:
+            reset_in = RESET_IN_SECONDS_RE.search(error.get("message", ""))
+            if reset_in:
+                if limiter is not None:
+                    limiter.block_for(float(reset_in.group(1)))
+                    self._thread_local.rate_limited = True
+                raise RetriableAPIError(error["message"])
+
+        message = "; ".join(error.get("message", "") for error in errors)
+        raise FatalAPIError(message or "Response without data")
+
+    def iter_response(
+        self, response: requests.Response, *path: str
+    ) -> Iterator[Tuple[dict, dict]]:
+        """Yield the records at a path under the response data with their parents.
+
+        The parent is the object holding the array of a record, e.g. the board
+        of an item. Streamed bodies are parsed while they are read, so their
+        parents only hold the fields queried before the array.
+        """
+        started = time.perf_counter()
+        root: dict = {}
+        records: Iterator[Tuple[dict, dict]]
+        if self.stream_responses and not hasattr(response, "_parsed_json"):
+            chunks = getattr(response, "_body_chunks", None)
+            if chunks is None:
+                chunks = response.iter_content(STREAM_CHUNK_SIZE)
+            records = (
+                (parents[-1], record)
+                for parents, record in iter_json_items(chunks, ("data",) + path, root)
+            )
+        else:
+            # Checked for errors before the records, in validate_response
+            root = self.response_json(response)
+            records = iter_nested(root["data"], path)
+
+        # Time spent on the records by the caller doesn't count as parsing
+        count = 0
+        parse_seconds = 0.0
+        try:
+            for parent, record in records:
+                count += 1
+                parse_seconds += time.perf_counter() - started
+                yield parent, record
+                started = time.perf_counter()
+        finally:
+            # Releases the connection even if the body was not read to the end
+            response.close()
+        parse_seconds += time.perf_counter() - started
+        if root.get("errors") or root.get("data") is None:
+            # Only a streamed body with data first gets here, its records
+            # were returned already so the request can't be retried
+            errors = root.get("errors") or []
+            message = "; ".join(error.get("message", "") for error in errors)
+            raise FatalAPIError(message or "Response without data")
+
+        data = root.get("data") or {}
+        setattr(response, "_record_count", count)
+        setattr(response, "_complexity", data.get("complexity"))
+        limiter = self.request_limiter(response.request)
+        if limiter is not None:
+            limiter.update(self.name, data.get("complexity"))
+        self.add_request_metric(response, count, parse_seconds, data.get("complexity"))
+
+    def add_request_metric(
+        self,
+        response: requests.Response,
+        records: int,
+        parse_seconds: float,
+        complexity: Optional[dict],
+    ) -> None:
+        """Log the metrics of a parsed response and add them to the run totals."""
+        retries = getattr(self._thread_local, "retries", 0)
+        backoff_seconds = getattr(self._thread_local, "backoff_seconds", 0.0)
+        self._thread_local.retries = 0
+        self._thread_local.backoff_seconds = 0.0
+
+        try:
+            # Bytes read off the wire, before decompression
+            response_bytes = int(response.raw.tell())
+        except (AttributeError, TypeError, ValueError):
+            response_bytes = len(response.content)
+
+        metric: Dict[str, Any] = {
+            "stream": self.name,
+            "context": getattr(response, "_context", None),
+            "http_status": response.status_code,
+            # Until the headers arrived, reading the body counts as parsing
+            "latency_seconds": response.elapsed.total_seconds(),
+            "parse_seconds": round(parse_seconds, 6),
+            "response_bytes": response_bytes,
+            "records": records,
+            "complexity": complexity["query"] if complexity else None,
+            "retries": retries,
+            "backoff_seconds": backoff_seconds,
+        }
+        self._write_metric_log(
+            {
+                "type": "timer",
+                "metric": "monday_request",
+                "value": metric["latency_seconds"],
+                "tags": metric,
+            },
+            None,
+        )
+        if self.request_metrics is not None:
+            self.request_metrics.add(metric)
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse the records of the stream."""
+        for _, record in self.iter_response(response, self.name):
+            yield record
+
+    def page_record_count(self, response: requests.Response) -> int:
+        """Return the number of records on the page, counted while parsing."""
+        if not hasattr(response, "_record_count"):
+            for _ in self.parse_response(response):
+                pass
+        return cast(int, getattr(response, "_record_count"))
+
     def get_next_page_token(
         self, response: requests.Response, previous_token: Optional[Any]
     ) -> Any:
         """Return the number of the next page."""
-        name_for_limit = self.name
-        if self.name == "boards":
-            limit_per_page = self.config["board_limit"]
-        else:
+        limit_per_page = self.page_size
+        if limit_per_page is None:
             return None
-            # All other objects are queried by parent IDs without pagination
 
         current_page = previous_token if previous_token is not None else 1
 
-        if len(response.json()["data"][name_for_limit]) == limit_per_page:
+        if self.page_record_count(response) == limit_per_page:
             next_page_token = current_page + 1
         else:
             next_page_token = None
 
         return next_page_token
 
+    @property
+    def selection_set(self) -> str:
+        """Return the fields to query for the properties selected in the catalog."""
+        fields = [
+            field
+            for prop, field in self.property_fields.items()
+            if self.mask.get(("properties", prop), True)
+        ]
+        return build_selection_set(fields)
+
+    def preload_records(self, context: dict, records: List[dict]) -> None:
+        """Keep records a parent query already returned for the given context."""
+        self._preloaded_records[json.dumps(context, sort_keys=True)] = records
+
+    def prefetch_records(self, context: dict) -> None:
+        """Start requesting records for the context in the worker pool.
+
+        Each record is counted against the memory budget as it comes in, and
+        the fetch stops once the budget is exceeded. The rest of the records
+        are fetched while the context is synced.
+        """
+        key = json.dumps(context, sort_keys=True)
+        if key in self._preloaded_records or key in self._prefetched_records:
+            return
+
+        def fetch() -> Tuple[List[dict], Iterator[dict]]:
+            budget = self.memory_budget
+            records: List[dict] = []
+            rest = iter(self.fetch_records(context))
+            try:
+                for record in rest:
+                    records.append(record)
+                    if budget is not None:
+                        budget.hold(1)
+                        if budget.exceeded():
+                            break
+            except BaseException:
+                if budget is not None:
+                    budget.release(len(records))
+                raise
+            return records, rest
+
+        self._prefetched_records[key] = cast(Executor, self.worker_pool).submit(fetch)
+
+    def discard_fetched_ahead(self) -> None:
+        """Drop the records fetched ahead for contexts that were not synced."""
+        self._preloaded_records = {}
+        prefetched, self._prefetched_records = self._prefetched_records, {}
+        for future in prefetched.values():
+            if future.cancel() or future.exception() is not None:
+                continue
+
+            records, rest = future.result()
+            if self.memory_budget is not None:
+                self.memory_budget.release(len(records))
+            close = getattr(rest, "close", None)
+            if close is not None:
+                # Releases the connection of a response not read to the end
+                close()
+
+    def fetch_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Request the records of the context from the API."""
+        return super().request_records(context)
+
+    def request_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Return preloaded or prefetched records, otherwise request them."""
+        key = json.dumps(context, sort_keys=True)
+        records = self._preloaded_records.pop(key, None)
+        if records is not None:
+            yield from records
+            return
+
+        prefetched = self._prefetched_records.pop(key, None)
+        if prefetched is None:
+            yield from self.fetch_records(context)
+            return
+
+        records, rest = prefetched.result()
+        yield from records
+        if self.memory_budget is not None:
+            self.memory_budget.release(len(records))
+        yield from rest
+
+    def get_records(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return records, then sync the child batches left over from the last ones.
+
+        The batches are synced before the SDK finalizes the state of the
+        partition, so no bookmark is saved ahead of the children it covers.
+        Records fetched ahead for children that were not synced are dropped.
+        """
+        try:
+            yield from self.records_ahead(context)
+            for child_stream in self.child_streams:
+                self._flush_child_batch(cast(MondayStream, child_stream))
+        finally:
+            # Children of records the SDK didn't sync, e.g. on errors
+            for child_stream in self.child_streams:
+                cast(MondayStream, child_stream).discard_fetched_ahead()
+
+    def records_ahead(self, context: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return records, prefetching child records of the upcoming ones.
+
+        Records are held back for as many records as the pool has workers, so
+        the children of those are requested while the current one is synced.
+        All messages are still written from the main thread in the usual order.
+        While the memory budget is exceeded, the records held back are synced
+        first and children of the next ones are not requested ahead.
+        """
+        if self.detect_changes and self.record_hashes is not None:
+            yield from self.changed_records(super().get_records(context))
+            return
+
+        pool = self.worker_pool
+        if pool is None or not self.child_streams:
+            yield from super().get_records(context)
+            return
+
+        lookahead = int(self.config["max_workers"])
+        budget = self.memory_budget
+        upcoming: Deque[dict] = deque()
+        for record in super().get_records(context):
+            while budget is not None and budget.exceeded() and upcoming:
+                yield upcoming.popleft()
+
+            # Otherwise its children are requested once it is synced
+            fetch_ahead = budget is None or not budget.exceeded()
+            if fetch_ahead and self.stream_maps[0].get_filter_result(record):
+                child_context = self.get_child_context(record, context)
+                for child_stream in self.child_streams:
+                    child = cast(MondayStream, child_stream)
+                    if child.context_batch_size <= 1 and self.should_sync_child(
+                        child, child_context
+                    ):
+                        child.prefetch_records(child_context)
+
+            upcoming.append(record)
+            if len(upcoming) > lookahead:
+                yield upcoming.popleft()
+
+        while upcoming:
+            yield upcoming.popleft()
+
+    def changed_records(self, records: Iterable[dict]) -> Iterator[dict]:
+        """Return the records whose content changed since the last run."""
+        hashes = cast(RecordHashes, self.record_hashes)
+        parent_key = cast(str, self.batch_context_key)
+        for record in records:
+            if hashes.changed(self.name, record[parent_key], record["id"], record):
+                yield record
+
+    def sync_removed_records(self, context: dict) -> None:
+        """Forget the records of the context that are gone, with tombstones."""
+        parent_key = cast(str, self.batch_context_key)
+        parent_ids = context.get(f"{parent_key}s") or [context[parent_key]]
+        hashes = cast(RecordHashes, self.record_hashes)
+        removed = hashes.removed(self.name, parent_ids)
+        if not self.selected or not self.config.get("emit_tombstones"):
+            return
+
+        deleted_at = self.tapped_at()
+        for parent_id, record_id in removed:
+            self._write_record_message(
+                {
+                    "id": record_id,
+                    parent_key: int(parent_id),
+                    "tapped_at": deleted_at,
+                    DELETED_AT_FIELD: deleted_at,
+                }
+            )
+
+    def prepare_request_payload(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Optional[dict]:
+        """Prepare the query, asking for the complexity budget if paced by it."""
+        request_data = cast(
+            dict, super().prepare_request_payload(context, next_page_token)
+        )
+        request_data["query"] = self.paced_query(request_data["query"])
+        return request_data
+
+    @property
+    def queries_complexity(self) -> bool:
+        """Return whether to ask for the complexity of queries."""
+        return self.rate_limiter is not None
+
+    def paced_query(self, query: str) -> str:
+        """Add the complexity field to the query if paced by the budget."""
+        if not self.queries_complexity:
+            return query
+
+        # The first brace opens the root selection set of the query
+        return query.replace("{", "{ " + COMPLEXITY_FIELD + " ", 1)
+
+    def request_query(
+        self, query: str, variables: dict, context: Optional[dict]
+    ) -> requests.Response:
+        """Send a query other than the one of the stream, with the same retries."""
+        request_data = {
+            "query": self.paced_query(
+                " ".join(line.strip() for line in query.strip().splitlines())
+            ),
+            "variables": variables,
+        }
+        prepared_request = self.requests_session.prepare_request(
+            requests.Request(
+                method=self.rest_method,
+                url=self.get_url(context),
+                headers=self.http_headers,
+                json=request_data,
+            )
+        )
+        decorated_request = self.request_decorator(self._request)
+        return cast(requests.Response, decorated_request(prepared_request, context))
+
+    def request_limiter(
+        self, request: requests.PreparedRequest
+    ) -> Optional[ComplexityRateLimiter]:
+        """Return the rate limiter of the token a request is sent with.
+
+        None for replayed responses, the budget they recorded is long spent.
+        """
+        if replaying(self.config):
+            return None
+
+        if self.token_pool is not None:
+            return self.token_pool.limiter(request.headers["Authorization"])
+
+        return self.rate_limiter
+
+    def seconds_blocked(self) -> float:
+        """Return how long until requests are no longer held back."""
+        if self.token_pool is not None:
+            return self.token_pool.seconds_blocked()
+
+        return cast(ComplexityRateLimiter, self.rate_limiter).seconds_blocked()
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """Send the request, paced by the complexity budget if enabled."""
+        if self.token_pool is not None:
+            # Retries go out with the token in turn as well
+            prepared_request.headers["Authorization"] = self.token_pool.acquire()
+
+        limiter = self.request_limiter(prepared_request)
+        if limiter is not None:
+            # The budget left is updated from the complexity field while parsing
+            limiter.wait(self.name)
+
+        response = super()._request(prepared_request, context)
+        # Tags the metrics of the request
+        setattr(response, "_context", context)
+        return response
+
     def validate_response(self, response: requests.Response) -> None:
         """Check response for errors.
 
         Gracefully handles rate limits.
 
         """
+        limiter = self.request_limiter(response.request)
         if response.status_code == 429:  # Rate limit error
+            if limiter is not None:
+                limiter.block_for(
+                    retry_after_seconds(response.headers.get("Retry-After"))
+                )
+                self._thread_local.rate_limited = True
             msg = f"{response.status_code} Server Error: " f"{response.reason}"
             raise RetriableAPIError(msg)
         elif response.status_code == 104:  # Connection reset by peer
@@ -67,9 +705,19 @@ class MondayStream(GraphQLStream):
         elif 500 <= response.status_code < 600:
             msg = f"{response.status_code} Server Error: " f"{response.reason}"
             raise RetriableAPIError(msg)
+        else:
+            # Errors in a successful response, like an exhausted budget, are
+            # raised here so the request is retried. A streamed body with
+            # data first is only checked once it is read.
+            self.response_errors(response)
+            if not hasattr(response, "_body_chunks"):
+                self.check_response_data(self.response_json(response), limiter)
 
     def request_decorator(self, func: Callable) -> Callable:
         """Handle custom backoff."""
+        if self.rate_limiter is not None or self.token_pool is not None:
+            return self._rate_limited_request_decorator(func)
+
         decorator: Callable = backoff.on_exception(
             backoff.constant,
             (
@@ -84,14 +732,236 @@ class MondayStream(GraphQLStream):
         )(func)
         return decorator
 
+    def _rate_limited_request_decorator(self, func: Callable) -> Callable:
+        """Retry after the rate limit is lifted, or back off on other errors.
+
+        Rate limits block the token they hit, so with several tokens a
+        rate limited request is retried at once with another one.
+        """
+
+        def wait_gen() -> Iterator[float]:
+            for wait in backoff.expo(factor=2, max_value=70):
+                rate_limited = getattr(self._thread_local, "rate_limited", False)
+                self._thread_local.rate_limited = False
+                if rate_limited:
+                    yield self.seconds_blocked()
+                else:
+                    yield self.seconds_blocked() or wait
+
+        decorator: Callable = backoff.on_exception(
+            wait_gen,
+            (
+                RetriableAPIError,
+                requests.exceptions.ConnectionError,
+                requests.exceptions.ReadTimeout,
+            ),
+            max_tries=10,
+            on_backoff=self.backoff_handler,
+            jitter=None,
+        )(func)
+        return decorator
+
     def backoff_handler(self, details: dict) -> None:
-        """Log backoff status."""
+        """Log backoff status, counting it into the metrics of the request."""
+        self._thread_local.retries = getattr(self._thread_local, "retries", 0) + 1
+        self._thread_local.backoff_seconds = (
+            getattr(self._thread_local, "backoff_seconds", 0.0) + details["wait"]
+        )
         self.logger.error(
             "Backing off {wait:0.1f} seconds after {tries} tries "
             "calling function {target} with args {args} and kwargs "
             "{kwargs}".format(**details)
         )
 
+    @property
+    def context_batch_size(self) -> int:
+        """Return how many parent contexts to query per request, 1 means no batching."""
+        return 1
+
+    def batch_context(self, contexts: List[dict]) -> dict:
+        """Merge contexts of several parent records into one batch context."""
+        key = cast(str, self.batch_context_key)
+        return {f"{key}s": [ctx[key] for ctx in contexts]}
+
+    def should_sync_child(self, child: "MondayStream", child_context: dict) -> bool:
+        """Return whether to sync the child stream for a record."""
+        return child.selected or child.has_selected_descendents
+
+    def _sync_children(self, child_context: dict) -> None:
+        """Sync child streams, buffering contexts for the ones that batch."""
+        for child_stream in self.child_streams:
+            child = cast(MondayStream, child_stream)
+            if not self.should_sync_child(child, child_context):
+                continue
+
+            if child.context_batch_size <= 1:
+                child.sync(context=child_context)
+                continue
+
+            batch = self._child_batches.setdefault(child.name, [])
+            batch.append(child_context)
+            if len(batch) >= child.context_batch_size:
+                self._flush_child_batch(child)
+
+    def _flush_child_batch(self, child: "MondayStream") -> None:
+        """Sync a child stream for the contexts buffered so far."""
+        batch = self._child_batches.pop(child.name, [])
+        if batch:
+            child.sync(context=child.batch_context(batch))
+
+    def _sync_records(self, context: Optional[dict] = None) -> None:
+        """Sync records, then finish what needs all of them synced."""
+        super()._sync_records(context)
+        if context and self.detect_changes and self.record_hashes is not None:
+            # All records of the parents in the context are synced now
+            self.sync_removed_records(context)
+
+        if context and self.memory_budget is not None:
+            self.release_partition_state(context)
+
+        if self.parent_stream_type is None and self.record_hashes is not None:
+            # Saved only once complete, an interrupted run emits the records again
+            self.record_hashes.save()
+
+        if self.parent_stream_type is None and self.request_metrics is not None:
+            # Children are done as well, report the requests of the run so far
+            self.request_metrics.report(self.logger, self.config.get("metrics_path"))
+
+        if self.parent_stream_type is None and self.record_writer is not None:
+            self.record_writer.flush()
+
+        if self.parent_stream_type is None and self.batch_writer is not None:
+            self.batch_writer.close()
+
+    def release_partition_state(self, context: dict) -> None:
+        """Drop the state of a synced context if it holds no bookmark.
+
+        The state otherwise keeps a partition for every parent record synced.
+        """
+        partition_context = self._get_state_partition_context(context)
+        partitions = self.stream_state.get("partitions", [])
+        for index, partition in enumerate(partitions):
+            if partition.get("context") == partition_context:
+                if set(partition) == {"context"}:
+                    del partitions[index]
+                return
+
     def tapped_at(self) -> str:
-        """Format current time for streams."""
-        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        """Format current time for streams, once per second or once per run."""
+        run_tapped_at = getattr(self._tap, "run_tapped_at", None)
+        if run_tapped_at is not None:
+            return run_tapped_at
+
+        second = int(time.time())
+        if second != self._tapped_at[0]:
+            formatted = datetime.fromtimestamp(second, timezone.utc)
+            self._tapped_at = (second, formatted.strftime(TAPPED_AT_FORMAT))
+        return self._tapped_at[1]
+
+
+class BoardBatchedStream(MondayStream):
+    """Stream of a field of boards, queried for many boards at once if enabled."""
+
+    batch_context_key = "board_id"
+    # Batches of boards share the stream state instead of a partition per batch
+    state_partitioning_keys = ["board_id"]
+    # Field of boards with the records, e.g. groups
+    board_field: str
+
+    @property
+    def context_batch_size(self) -> int:
+        """Query board_batch_size boards at once unless fetched with the boards."""
+        if self.config.get("combined_board_fetch"):
+            return 1
+
+        return int(self.config["board_batch_size"])
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        """Get board_ids from the context."""
+        ctx: dict = cast(dict, context)
+        if "board_ids" in ctx:
+            return {
+                "board_ids": ctx["board_ids"],
+                "board_limit": len(ctx["board_ids"]),
+            }
+
+        return {
+            "board_ids": ctx["board_id"],
+        }
+
+    @property
+    def query(self) -> str:
+        """Form the query of the field of the boards."""
+        query_name = self.board_field.capitalize()
+        if self.context_batch_size > 1:
+            ql_string = f"""
+                query {query_name}($board_ids: [Int], $board_limit: Int) {{
+                    boards(ids: $board_ids, limit: $board_limit) {{
+            """
+        else:
+            ql_string = f"""
+                query {query_name}($board_ids: [Int]) {{
+                    boards(ids: $board_ids) {{
+            """
+
+        ql_string += f"""
+                    id
+                    {self.board_field} {{
+        """
+        ql_string += self.selection_set
+        ql_string += """
+                    }
+                }
+            }
+        """
+
+        return ql_string
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse the records of the boards."""
+        for board, row in self.iter_response(response, "boards", self.board_field):
+            # Tells the boards of a batch apart in post_process
+            row["board_id"] = board["id"]
+            yield row
+
+
+class ItemBatchedStream(MondayStream):
+    """Stream of children of items, queried for many items at once if enabled."""
+
+    batch_context_key = "item_id"
+    # Batches of items share the stream state instead of a partition per batch
+    state_partitioning_keys = ["item_id"]
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the stream, keeping the bookmark of items if incremental.
+
+        Otherwise the items stream is forced to full table once this is selected.
+        Children are only synced for the items updated since the bookmark then.
+        """
+        super().__init__(*args, **kwargs)
+        self.ignore_parent_replication_key = not self.config.get("incremental_items")
+
+    @property
+    def context_batch_size(self) -> int:
+        """Query column_value_limit items at once if batch_column_values is on."""
+        if self.config.get("batch_column_values"):
+            return int(self.config["column_value_limit"])
+
+        return 1
+
+    def get_url_params(
+        self, context: Optional[dict], next_page_token: Optional[Any]
+    ) -> Dict[str, Any]:
+        """Get item_ids from the context."""
+        ctx: dict = cast(dict, context)
+        if "item_ids" in ctx:
+            return {
+                "item_ids": ctx["item_ids"],
+                "item_limit": len(ctx["item_ids"]),
+            }
+
+        return {
+            "item_ids": ctx["item_id"],
+        }
@@ -0,0 +1,76 @@
+"""On-disk cache of the column definitions of boards."""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+class ColumnCache:
+    """Column definitions per board, valid while the board is not updated.
+
+    Boards stream reports the updated_at of every board with `observe_board`.
+    Cached columns of a board are only returned while its updated_at is the
+    same as when they were cached. The cache is read from and saved to a JSON
+    file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Load the cache file, if there is one."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._observed: Dict[int, str] = {}
+        self._boards: Dict[int, dict] = {}
+        self._columns_by_id: Dict[int, Dict[str, dict]] = {}
+        if os.path.exists(path):
+            with open(path) as cache_file:
+                boards = json.load(cache_file)["boards"]
+            for board_id, entry in boards.items():
+                self._store(int(board_id), entry)
+
+    def _store(self, board_id: int, entry: dict) -> None:
+        self._boards[board_id] = entry
+        self._columns_by_id[board_id] = {
+            column["id"]: column for column in entry["columns"]
+        }
+
+    def observe_board(self, board_id: int, updated_at: Optional[str]) -> None:
+        """Note the current updated_at of a board."""
+        if updated_at is not None:
+            with self._lock:
+                self._observed[board_id] = updated_at
+
+    def _valid(self, board_id: int) -> bool:
+        entry = self._boards.get(board_id)
+        observed = self._observed.get(board_id)
+        return entry is not None and observed == entry["updated_at"]
+
+    def get(self, board_id: int) -> Optional[List[dict]]:
+        """Return the cached columns of a board, None if missing or stale."""
+        with self._lock:
+            if not self._valid(board_id):
+                return None
+            return self._boards[board_id]["columns"]
+
+    def get_column(self, board_id: int, column_id: str) -> Optional[dict]:
+        """Return a cached column, None if the board is missing or stale."""
+        with self._lock:
+            if not self._valid(board_id):
+                return None
+            return self._columns_by_id[board_id].get(column_id, {})
+
+    def put(self, board_id: int, columns: List[dict]) -> None:
+        """Cache the columns of a board as of its observed updated_at."""
+        with self._lock:
+            updated_at = self._observed.get(board_id)
+            if updated_at is not None:
+                self._store(board_id, {"updated_at": updated_at, "columns": columns})
+
+    def save(self) -> None:
+        """Write the cache file, replacing it only once it is complete."""
+        with self._lock:
+            boards = {str(board_id): entry for board_id, entry in self._boards.items()}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as cache_file:
+            json.dump({"boards": boards}, cache_file)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,139 @@
+"""Incremental parsing of JSON documents read in chunks."""
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_decoder = json.JSONDecoder()
+
+WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Buffer of a JSON document that is read in as the parser needs it."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size: int = 0) -> bool:
+        """Read chunks until the buffer grows past min_size, False at the end."""
+        pos = self.pos
+        unread = [self.buffer[pos:]]
+        size = len(unread[0])
+        read = False
+        while not read or size < min_size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.eof = True
+                unread.append(self._utf8.decode(b"", final=True))
+                break
+            text = self._utf8.decode(chunk)
+            unread.append(text)
+            size += len(text)
+            read = True
+
+        self.buffer = "".join(unread)
+        self.pos = 0
+        return read
+
+    def peek(self) -> str:
+        """Return the next character that is not whitespace."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char: str) -> None:
+        """Consume the next character, which must be char."""
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON document at {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Doubling the buffer keeps long values from being re-parsed
+                # for every chunk
+                if not self.fill(2 * (len(self.buffer) - self.pos)):
+                    raise
+                continue
+
+            if end == len(self.buffer) and not self.eof and self.fill():
+                # A number at the end of the buffer may go on in the next chunk
+                continue
+
+            self.pos = end
+            return value
+
+
+def iter_json_items(
+    chunks: Iterable[bytes], path: Sequence[str], root: Optional[dict] = None
+) -> Iterator[Tuple[List[dict], Any]]:
+    """Yield the elements of the arrays at a path of keys while reading chunks.
+
+    Each key of the path names a member of an object. Where that member is an
+    array, the rest of the path is followed in each of its elements. The
+    elements of the arrays at the end of the path are decoded one at a time
+    and yielded with the objects they are nested in, holding the members that
+    preceded them. Those objects also end up in root, e.g. root["data"].
+
+    Only one element is held in memory at a time, besides the members that
+    are not on the path.
+    """
+    reader = _Reader(chunks)
+    yield from _walk_object(reader, path, [], {} if root is None else root)
+
+
+def _walk_object(
+    reader: _Reader, path: Sequence[str], parents: List[dict], members: dict
+) -> Iterator[Tuple[List[dict], Any]]:
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key != path[0] or reader.peek() == "n":  # Not on the path, or null
+            members[key] = reader.value()
+        elif len(path) == 1:
+            for element in _walk_array(reader):
+                yield parents + [members], element
+        elif reader.peek() == "{":
+            members[key] = {}
+            yield from _walk_object(reader, path[1:], parents + [members], members[key])
+        else:
+            for _ in _walk_array(reader, iterate=True):
+                yield from _walk_object(reader, path[1:], parents + [members], {})
+
+        if reader.peek() == "}":
+            reader.pos += 1
+            return
+        reader.expect(",")
+
+
+def _walk_array(reader: _Reader, iterate: bool = False) -> Iterator[Any]:
+    """Yield decoded elements, or just advance to each element if iterate."""
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+
+    while True:
+        yield None if iterate else reader.value()
+        if reader.peek() == "]":
+            reader.pos += 1
+            return
+        reader.expect(",")
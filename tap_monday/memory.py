@@ -0,0 +1,59 @@
+"""Ceiling on the records held in memory ahead of being written."""
+
+import os
+import threading
+from typing import Callable, Optional
+
+
+def current_rss_mb() -> Optional[float]:
+    """Return the resident memory of the process in MB, None if unknown."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class MemoryBudget:
+    """Records fetched ahead of being written, counted against a ceiling.
+
+    Streams `hold` the records they keep for later, like prefetched or
+    preloaded child records, and `release` them once written. While more
+    than max_records are held, or the resident memory of the process is over
+    max_rss_mb, the budget is `exceeded` and fetching ahead pauses.
+    """
+
+    def __init__(
+        self,
+        max_records: int,
+        max_rss_mb: Optional[float] = None,
+        rss_mb: Callable[[], Optional[float]] = current_rss_mb,
+    ) -> None:
+        """Initialize the budget with no records held."""
+        self.max_records = max_records
+        self.max_rss_mb = max_rss_mb
+        self._rss_mb = rss_mb
+        self._lock = threading.Lock()
+        self.held = 0
+
+    def hold(self, count: int) -> None:
+        """Count records kept in memory."""
+        with self._lock:
+            self.held += count
+
+    def release(self, count: int) -> None:
+        """Count records no longer kept in memory."""
+        with self._lock:
+            self.held -= count
+
+    def exceeded(self) -> bool:
+        """Return whether to hold off fetching ahead."""
+        if self.held > self.max_records:
+            return True
+
+        if self.max_rss_mb is None:
+            return False
+
+        rss_mb = self._rss_mb()
+        return rss_mb is not None and rss_mb > self.max_rss_mb
@@ -0,0 +1,75 @@
+"""Per-request metrics of a sync, summarized per stream."""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+
+def percentile(values: List[float], share: float) -> float:
+    """Return the value below which the share of the sorted values falls."""
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class RequestMetrics:
+    """Collect the measurements of every request of a sync.
+
+    Streams `add` a metric per request once its response is parsed, from any
+    thread. The summary holds the totals and latency percentiles per stream.
+    """
+
+    COUNTERS = (
+        "records",
+        "response_bytes",
+        "complexity",
+        "retries",
+        "backoff_seconds",
+        "parse_seconds",
+    )
+
+    def __init__(self) -> None:
+        """Initialize the metrics without any requests."""
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._latencies: Dict[str, List[float]] = {}
+
+    def add(self, metric: Dict[str, Any]) -> None:
+        """Add the metric of a request to the totals of its stream."""
+        stream = metric["stream"]
+        with self._lock:
+            totals = self._totals.setdefault(
+                stream, dict.fromkeys(("requests",) + self.COUNTERS, 0)
+            )
+            totals["requests"] += 1
+            for counter in self.COUNTERS:
+                totals[counter] += metric.get(counter) or 0
+            self._latencies.setdefault(stream, []).append(metric["latency_seconds"])
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return the totals and latencies of the requests per stream."""
+        with self._lock:
+            summary: Dict[str, Dict[str, Any]] = {}
+            for stream, totals in self._totals.items():
+                latencies = sorted(self._latencies[stream])
+                summary[stream] = {
+                    **{key: round(value, 3) for key, value in totals.items()},
+                    "latency_seconds": {
+                        "total": round(sum(latencies), 3),
+                        "p50": percentile(latencies, 0.5),
+                        "p95": percentile(latencies, 0.95),
+                        "max": latencies[-1],
+                    },
+                }
+            return summary
+
+    def report(self, logger: logging.Logger, path: Optional[str] = None) -> None:
+        """Log the summary per stream, and write it to a JSON file if given."""
+        summary = self.summary()
+        for stream, totals in summary.items():
+            logger.info(f"INFO METRIC: {str({'stream': stream, **totals})}")
+
+        if path:
+            with open(path, "w") as metrics_file:
+                json.dump({"streams": summary}, metrics_file, indent=2)
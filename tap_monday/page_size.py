@@ -0,0 +1,74 @@
+"""Page size adapting to the latency and complexity of responses."""
+
+import math
+import threading
+from typing import Optional
+
+
+class AdaptivePageSize:
+    """Page size that grows while pages stay under target, halved on errors.
+
+    Sizes are the minimum doubled any number of times, up to the maximum.
+    After a page, `observe` doubles the size if a page twice as large is
+    expected to stay under the target latency and complexity, and halves it
+    if the page went over. `shrink` halves it after a failed request.
+
+    Pages are requested by number and size, so a page starting at an offset
+    can only have a size that the offset is a multiple of. `limit_at` returns
+    the largest size up to the current one that fits the offset.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        target_seconds: float,
+        target_complexity: int,
+    ) -> None:
+        """Initialize the size to the largest one up to initial."""
+        self.target_seconds = target_seconds
+        self.target_complexity = target_complexity
+        self._lock = threading.Lock()
+        self._sizes = [max(minimum, 1)]
+        while self._sizes[-1] * 2 <= maximum:
+            self._sizes.append(self._sizes[-1] * 2)
+        self._index = max(
+            index
+            for index, size in enumerate(self._sizes)
+            if size <= initial or not index
+        )
+
+    @property
+    def size(self) -> int:
+        """Return the current page size."""
+        return self._sizes[self._index]
+
+    def limit_at(self, offset: int) -> int:
+        """Return the size of the page starting at an offset."""
+        with self._lock:
+            for size in reversed(self._sizes[: self._index + 1]):
+                if offset % size == 0:
+                    return size
+
+            # The offset does not fit the sizes, e.g. after the minimum changed
+            return math.gcd(offset, self.size)
+
+    def observe(self, seconds: float, complexity: Optional[int]) -> None:
+        """Resize after a page by its latency and complexity, if known."""
+        over = seconds > self.target_seconds or (
+            complexity is not None and complexity > self.target_complexity
+        )
+        under_half = seconds * 2 <= self.target_seconds and (
+            complexity is None or complexity * 2 <= self.target_complexity
+        )
+        with self._lock:
+            if over:
+                self._index = max(self._index - 1, 0)
+            elif under_half:
+                self._index = min(self._index + 1, len(self._sizes) - 1)
+
+    def shrink(self) -> None:
+        """Halve the size after a request failed, down to the minimum."""
+        with self._lock:
+            self._index = max(self._index - 1, 0)
@@ -0,0 +1,152 @@
+"""Client-side pacing by the Monday.com complexity budget."""
+
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional
+
+# Monday.com budgets complexity per minute, used when the reset time is unknown
+BUDGET_PERIOD_SECONDS = 60
+
+COMPLEXITY_FIELD = "complexity { before after query reset_in_x_seconds }"
+RESET_IN_SECONDS_RE = re.compile(r"reset in (\d+) seconds")
+# Error of a single query over the complexity limit, whatever the budget left
+MAX_COMPLEXITY_RE = re.compile(r"exceeds max complexity")
+
+
+def retry_after_seconds(
+    value: Optional[str], now: Callable[[], float] = time.time
+) -> Optional[float]:
+    """Return the seconds to wait by a Retry-After header, None if unknown.
+
+    The header is either a number of seconds or an HTTP date.
+    """
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        return None
+    return max(retry_at.timestamp() - now(), 0.0)
+
+
+class ComplexityRateLimiter:
+    """Pace requests to stay within the per-minute complexity budget.
+
+    Every query asks for the complexity field as well, and the result is fed
+    back with `update`. Before a request `wait` sleeps until the budget resets
+    if the last cost of the same query does not fit into what is left. Rate
+    limit responses block all requests with `block_for`.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the limiter with an unknown budget."""
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._blocked_until = 0.0
+        self._costs: Dict[str, int] = {}
+
+    def wait(self, query_name: str) -> None:
+        """Sleep until the budget fits another query of the given name."""
+        with self._lock:
+            now = self._clock()
+            cost = self._costs.get(query_name, 0)
+            if self._remaining is not None and now < self._reset_at:
+                if self._remaining < cost:
+                    # Everyone waits for the reset, the budget is unknown after it
+                    self._blocked_until = max(self._blocked_until, self._reset_at)
+                    self._remaining = None
+                else:
+                    self._remaining -= cost
+            delay = self._blocked_until - now
+
+        if delay > 0:
+            self._sleep(delay)
+
+    def update(self, query_name: str, complexity: Optional[dict]) -> None:
+        """Record the budget left and the cost of the query from a response."""
+        if not complexity:
+            return
+
+        with self._lock:
+            self._costs[query_name] = complexity["query"]
+            self._remaining = complexity["after"]
+            self._reset_at = self._clock() + complexity["reset_in_x_seconds"]
+
+    def block_for(self, seconds: Optional[float] = None) -> None:
+        """Hold back all requests, until the budget resets if seconds is None."""
+        with self._lock:
+            now = self._clock()
+            if seconds is None:
+                if self._reset_at > now:
+                    seconds = self._reset_at - now
+                else:
+                    seconds = BUDGET_PERIOD_SECONDS
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._remaining = None
+
+    def seconds_blocked(self) -> float:
+        """Return how long requests are still held back."""
+        with self._lock:
+            return max(0.0, self._blocked_until - self._clock())
+
+
+class TokenPool:
+    """API tokens taking turns, each with its own rate limiter.
+
+    Monday.com budgets complexity per token. `acquire` returns the next token
+    in turn that is not held back by its limiter, so throttled tokens are out
+    of rotation until they are lifted. If all of them are, the one lifted
+    first is returned.
+    """
+
+    def __init__(
+        self,
+        tokens: List[str],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize a limiter per token."""
+        self._tokens = list(dict.fromkeys(tokens))
+        self._limiters = {
+            token: ComplexityRateLimiter(clock, sleep) for token in self._tokens
+        }
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self) -> str:
+        """Return the token to send the next request with."""
+        with self._lock:
+            count = len(self._tokens)
+            for turn in range(count):
+                token = self._tokens[(self._next + turn) % count]
+                if not self._limiters[token].seconds_blocked():
+                    self._next = (self._next + turn + 1) % count
+                    return token
+
+            return min(
+                self._tokens, key=lambda token: self._limiters[token].seconds_blocked()
+            )
+
+    def limiter(self, token: str) -> ComplexityRateLimiter:
+        """Return the rate limiter of a token."""
+        return self._limiters[token]
+
+    def seconds_blocked(self) -> float:
+        """Return how long until any of the tokens is lifted."""
+        return min(limiter.seconds_blocked() for limiter in self._limiters.values())
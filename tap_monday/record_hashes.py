@@ -0,0 +1,74 @@
+"""On-disk content hashes of full-table records, to emit only changed ones."""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+# Fields that differ on every run without the record changing
+IGNORED_FIELDS = ("tapped_at",)
+
+
+def record_hash(record: dict) -> str:
+    """Return a compact hash of the content of a record."""
+    content = {key: value for key, value in record.items() if key not in IGNORED_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class RecordHashes:
+    """Content hashes of records per stream, by parent ID and record ID.
+
+    Streams ask whether a record `changed` since the hashes were saved, which
+    also stores its new hash. Once all records of a parent are synced, the
+    ones that were not seen again are `removed`. The hashes are read from and
+    saved to a JSON file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Load the hashes file, if there is one."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self._seen: Set[Tuple[str, str, str]] = set()
+        if os.path.exists(path):
+            with open(path) as hashes_file:
+                self._hashes = json.load(hashes_file)["streams"]
+
+    def changed(
+        self, stream: str, parent_id: Any, record_id: Any, record: dict
+    ) -> bool:
+        """Store the hash of a record, return whether it differs from before."""
+        parent, key = str(parent_id), str(record_id)
+        new_hash = record_hash(record)
+        with self._lock:
+            self._seen.add((stream, parent, key))
+            hashes = self._hashes.setdefault(stream, {}).setdefault(parent, {})
+            old_hash = hashes.get(key)
+            hashes[key] = new_hash
+        return old_hash != new_hash
+
+    def removed(self, stream: str, parent_ids: Iterable[Any]) -> List[Tuple[str, str]]:
+        """Forget and return the records of parents that were not seen again."""
+        removed = []
+        with self._lock:
+            stream_hashes = self._hashes.get(stream, {})
+            for parent in map(str, parent_ids):
+                hashes = stream_hashes.get(parent, {})
+                for key in list(hashes):
+                    if (stream, parent, key) not in self._seen:
+                        del hashes[key]
+                        removed.append((parent, key))
+                if not hashes:
+                    stream_hashes.pop(parent, None)
+        return removed
+
+    def save(self) -> None:
+        """Write the hashes file, replacing it only once it is complete."""
+        with self._lock:
+            content = json.dumps({"streams": self._hashes})
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as hashes_file:
+            hashes_file.write(content)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,119 @@
+"""Fast writing of RECORD messages in large buffered chunks."""
+
+import json
+import sys
+from datetime import datetime, timezone
+from json.encoder import c_make_encoder  # type: ignore
+from json.encoder import encode_basestring_ascii
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+import singer
+from singer import RecordMessage
+
+# Characters of RECORD messages buffered before they are written out
+BUFFER_SIZE = 1024 * 1024
+
+
+def dumps_value(value: Any) -> str:
+    """Encode a value as JSON, strings without the overhead of json.dumps."""
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+
+    return json.dumps(value)
+
+
+def make_encoder() -> Callable[[Any], str]:
+    """Return a function encoding values like json.dumps, set up only once.
+
+    json.dumps sets up a new C encoder for every value, this one is reused.
+    """
+    if c_make_encoder is None:
+        return json.JSONEncoder(check_circular=False).encode
+
+    iterencode = c_make_encoder(
+        None,
+        json.JSONEncoder().default,
+        encode_basestring_ascii,
+        None,
+        ": ",
+        ", ",
+        False,
+        False,
+        True,
+    )
+    return lambda value: "".join(iterencode(value, 0))
+
+
+def format_time(value: datetime) -> str:
+    """Format a time in UTC like singer.utils.strftime, just faster."""
+    if value.utcoffset():
+        value = value.astimezone(timezone.utc)
+    # Without the offset, times of the SDK are pendulum ones with their own
+    return datetime.isoformat(value, timespec="microseconds")[:26] + "Z"
+
+
+class RecordWriter:
+    """Writes RECORD messages to an output, buffering them in large chunks.
+
+    Messages are encoded like singer.format_message, with the fields in the
+    same order. The part up to the record is encoded once per stream and the
+    record by an encoder set up only once; records it can't encode, e.g. with
+    decimals, are encoded by singer instead.
+
+    Buffered messages are written out once buffer_size characters add up, on
+    `flush`, and before any other message is written with `write_message`.
+    Without an output, they go to the current sys.stdout.
+    """
+
+    def __init__(
+        self, output: Optional[TextIO] = None, buffer_size: int = BUFFER_SIZE
+    ) -> None:
+        """Initialize an empty buffer."""
+        self.output = output
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._prefixes: Dict[str, str] = {}
+        self._encode = make_encoder()
+
+    def write(self, message: RecordMessage) -> None:
+        """Buffer a RECORD message."""
+        prefix = self._prefixes.get(message.stream)
+        if prefix is None:
+            prefix = '{"type": "RECORD", "stream": %s, "record": ' % (
+                encode_basestring_ascii(message.stream)
+            )
+            self._prefixes[message.stream] = prefix
+
+        try:
+            parts = [prefix, self._encode(message.record)]
+        except TypeError:
+            parts = [singer.format_message(message)]
+        else:
+            if message.version is not None:
+                parts.append(', "version": %s' % self._encode(message.version))
+            if message.time_extracted:
+                parts.append(
+                    ', "time_extracted": "%s"' % format_time(message.time_extracted)
+                )
+            parts.append("}")
+        parts.append("\n")
+
+        self._buffer.extend(parts)
+        self._buffered += sum(map(len, parts))
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_message(self, message: singer.Message) -> None:
+        """Write any message after the RECORD messages buffered so far."""
+        self.flush()
+        singer.write_message(message)
+
+    def flush(self) -> None:
+        """Write out the buffered messages."""
+        output = self.output or sys.stdout
+        if self._buffer:
+            output.write("".join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        output.flush()
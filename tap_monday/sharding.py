@@ -0,0 +1,182 @@
+"""Sharded runs, syncing the boards in several tap processes."""
+
+import copy
+import json
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+TAP_CLI = "from tap_monday.tap import TapMonday; TapMonday.cli()"
+
+# Files every process would otherwise write to, each shard gets its own
+SHARDED_PATH_SETTINGS = ("column_cache_path", "change_detection_path", "metrics_path")
+
+# Seconds between the merged STATE messages written while the shards run
+STATE_INTERVAL_SECONDS = 30
+
+SCHEMA_PREFIX = '{"type": "SCHEMA"'
+STATE_PREFIX = '{"type": "STATE"'
+
+
+def get_shard(config: Mapping[str, Any]) -> Optional[Tuple[int, int]]:
+    """Return the index and count of the shard a worker process syncs."""
+    if config.get("shard_index") is None:
+        return None
+
+    return int(config["shard_index"]), int(config["shard_processes"])
+
+
+def in_shard(board_id: int, shard: Optional[Tuple[int, int]]) -> bool:
+    """Return whether a board belongs to the shard, all do without one."""
+    if shard is None:
+        return True
+
+    index, count = shard
+    return board_id % count == index
+
+
+def shard_key(key: str, shard: Optional[Tuple[int, int]]) -> str:
+    """Return a state key that only the process of the shard writes."""
+    if shard is None:
+        return key
+
+    index, count = shard
+    return f"{key}_shard_{index}_of_{count}"
+
+
+def shard_config(config: Mapping[str, Any], index: int) -> dict:
+    """Return the config of the worker process syncing a shard."""
+    shard = {**config, "shard_index": index}
+    for setting in SHARDED_PATH_SETTINGS:
+        if config.get(setting):
+            shard[setting] = f"{config[setting]}.shard{index}"
+    return shard
+
+
+def merge_state(state: dict, other: dict) -> dict:
+    """Merge the state of another shard into a state, returning it.
+
+    Partitions are matched by their context. Of two values for the same key,
+    like bookmarks, the larger one is kept.
+    """
+    for key, value in other.items():
+        current = state.get(key)
+        if current is None:
+            state[key] = copy.deepcopy(value)
+        elif key == "partitions":
+            by_context = {
+                json.dumps(partition.get("context"), sort_keys=True): partition
+                for partition in current
+            }
+            for partition in value:
+                context = json.dumps(partition.get("context"), sort_keys=True)
+                if context in by_context:
+                    merge_state(by_context[context], partition)
+                else:
+                    current.append(copy.deepcopy(partition))
+                    by_context[context] = current[-1]
+        elif isinstance(current, dict) and isinstance(value, dict):
+            merge_state(current, value)
+        elif isinstance(current, list) and isinstance(value, list):
+            current.extend(element for element in value if element not in current)
+        elif value is not None and value > current:
+            state[key] = value
+    return state
+
+
+def merged_state(states: Iterable[dict]) -> dict:
+    """Return the states of all shards merged into one."""
+    merged: dict = {}
+    for state in states:
+        merge_state(merged, state)
+    return merged
+
+
+def run_shards(
+    config: Mapping[str, Any],
+    catalog: dict,
+    states: List[dict],
+    output: TextIO,
+    write_state: Callable[[dict], None],
+    written_schemas: Set[str],
+) -> dict:
+    """Sync each shard in a tap process, merging their messages into output.
+
+    Each process gets the shard's state from states. RECORD messages are
+    passed through as they arrive and the SCHEMA of each stream only once.
+    The STATE messages of the processes are merged, and written with
+    write_state now and then. Returns the merged final state.
+    """
+    lines: "queue.Queue[Tuple[int, Optional[str]]]" = queue.Queue()
+    latest_states = list(states)
+    processes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = Path(tmp) / "catalog.json"
+        catalog_path.write_text(json.dumps(catalog))
+        for index, state in enumerate(states):
+            config_path = Path(tmp) / f"config_{index}.json"
+            config_path.write_text(json.dumps(shard_config(config, index)))
+            state_path = Path(tmp) / f"state_{index}.json"
+            state_path.write_text(json.dumps(state))
+            process = subprocess.Popen(
+                [sys.executable, "-c", TAP_CLI]
+                + ["--config", str(config_path), "--catalog", str(catalog_path)]
+                + ["--state", str(state_path)],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            processes.append(process)
+            threading.Thread(
+                target=_read_lines, args=(index, process.stdout, lines), daemon=True
+            ).start()
+
+        running = len(processes)
+        state_written_at = time.monotonic()
+        while running:
+            index, line = lines.get()
+            if line is None:
+                running -= 1
+            elif line.startswith(STATE_PREFIX):
+                latest_states[index] = json.loads(line)["value"]
+            elif line.startswith(SCHEMA_PREFIX):
+                stream = json.loads(line)["stream"]
+                if stream not in written_schemas:
+                    written_schemas.add(stream)
+                    output.write(line)
+            else:
+                output.write(line)
+
+            if lines.empty():
+                output.flush()
+                if time.monotonic() - state_written_at > STATE_INTERVAL_SECONDS:
+                    write_state(merged_state(latest_states))
+                    state_written_at = time.monotonic()
+
+        failed = [
+            index for index, process in enumerate(processes) if process.wait() != 0
+        ]
+
+    if failed:
+        raise RuntimeError(f"Shards {failed} of the sharded sync failed")
+    return merged_state(latest_states)
+
+
+def _read_lines(index: int, stream: Any, lines: "queue.Queue") -> None:
+    for line in stream:
+        lines.put((index, line))
+    lines.put((index, None))
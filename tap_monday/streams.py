@@ -1,16 +1,70 @@
 """Stream type classes for tap-monday."""
 
+import copy
 import requests
 import json
 import re
+import sys
 
 from pathlib import Path
-from typing import Any, Optional, Dict, Iterable, cast, List
+from typing import Any, Optional, Dict, Iterable, cast, List, Mapping, Set, Tuple
 
-from tap_monday.client import MondayStream
+from singer_sdk import Tap
+from singer_sdk.exceptions import RetriableAPIError
+from singer_sdk.helpers._state import get_state_if_exists
+
+from tap_monday.client import (
+    BoardBatchedStream,
+    ItemBatchedStream,
+    MondayStream,
+    build_selection_set,
+)
+from tap_monday.column_cache import ColumnCache
+from tap_monday.page_size import AdaptivePageSize
+from tap_monday.rate_limit import MAX_COMPLEXITY_RE
+from tap_monday.serialization import dumps_value
+from tap_monday.sharding import get_shard, in_shard, run_shards, shard_key
 
 SCHEMAS_DIR = Path(__file__).parent / Path("./schemas")
 
+# Boards state key of the updated_at each board had when a child was synced
+CHILD_BOOKMARKS_KEY = "child_bookmarks"
+
+# Boards state key of the page an interrupted sync resumes from, with the
+# boards of that page whose children were already synced
+CHECKPOINT_KEY = "checkpoint"
+
+# Activity log entries requested per page when looking for updated items
+ACTIVITY_LOGS_PER_PAGE = 500
+
+# Column value fields that are attributes of the column, from the column cache
+COLUMN_ATTRIBUTES = ["title", "type", "description"]
+
+
+def config_board_ids(config: Mapping[str, Any]) -> Optional[List[int]]:
+    """Return board_ids of the config as a list of ints, None if not set."""
+    board_ids_conf = config.get("board_ids")
+    if not board_ids_conf:
+        return None
+
+    if type(board_ids_conf) is str:
+        return list(map(int, re.split(r",\s*", board_ids_conf)))
+
+    return board_ids_conf
+
+
+def shard_board_ids(config: Mapping[str, Any]) -> Optional[List[int]]:
+    """Return board_ids of the config in the shard, None if not set.
+
+    An empty list means that none of them fall in the shard.
+    """
+    board_ids = config_board_ids(config)
+    shard = get_shard(config)
+    if board_ids is None or shard is None:
+        return board_ids
+
+    return [board_id for board_id in board_ids if in_shard(board_id, shard)]
+
 
 class BoardsStream(MondayStream):
     """Loads boards."""
@@ -19,22 +73,89 @@ class BoardsStream(MondayStream):
     schema_filepath = SCHEMAS_DIR / "boards.json"
     primary_keys = ["id"]
     replication_key = "updated_at"  # ISO8601/RFC3339, example: 2022-01-07T15:56:08Z
+    property_fields = {
+        "id": "id",
+        "name": "name",
+        "description": "description",
+        "state": "state",
+        "updated_at": "updated_at",
+        "workspace_id": "workspace.id",
+        "workspace_name": "workspace.name",
+        "owner_id": "owner.id",
+        "owner_name": "owner.name",
+        "owner_email": "owner.email",
+    }
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the stream and the updates of the boards seen."""
+        super().__init__(*args, **kwargs)
+        self._board_updated_at: Dict[int, str] = {}
+        self._synced_child_bookmarks: Dict[str, Dict[str, str]] = {}
+        self._board_pages: Dict[int, int] = {}
+        self._unfinished_boards: List[int] = []
+        self._resumed_checkpoint: dict = {}
+        self._adaptive_page_size: Optional[AdaptivePageSize] = None
+        self._board_ids = shard_board_ids(self.config)
+        if self.config.get("adaptive_board_limit"):
+            self._adaptive_page_size = AdaptivePageSize(
+                int(self.config["board_limit"]),
+                int(self.config["min_board_limit"]),
+                int(self.config["max_board_limit"]),
+                float(self.config["board_page_target_seconds"]),
+                int(self.config["board_page_target_complexity"]),
+            )
+
+    @property
+    def shard(self) -> Optional[Tuple[int, int]]:
+        """Return the index and count of the shard synced by this process."""
+        return get_shard(self.config)
+
+    @property
+    def shard_processes(self) -> int:
+        """Return how many processes to sync the boards in, one per board at most."""
+        count = int(self.config["shard_processes"])
+        if self._board_ids is not None and self.shard is None:
+            count = min(count, max(len(self._board_ids), 1))
+        return count
+
+    @property
+    def checkpoint_key(self) -> str:
+        """Return the state key of the checkpoint, one per shard."""
+        return shard_key(CHECKPOINT_KEY, self.shard)
 
     def board_ids(self) -> Optional[List[int]]:
-        """Ensure that board_ids is a list of ints."""
-        board_ids_conf = self.config.get("board_ids")
-        if board_ids_conf and type(board_ids_conf) is str:
-            board_ids = list(map(int, re.split(r",\s*", board_ids_conf)))
-            return board_ids
+        """Return board_ids of the config as ints, of the shard if sharded.
+
+        None means all boards, an empty list that none fall in the shard.
+        """
+        return self._board_ids
+
+    @property
+    def page_size(self) -> Optional[int]:
+        """Return the number of boards per page."""
+        return self.config["board_limit"]
 
-        return board_ids_conf
+    @property
+    def queries_complexity(self) -> bool:
+        """Ask for the complexity of queries to adapt the page size to as well."""
+        return super().queries_complexity or self._adaptive_page_size is not None
 
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
         """Set pagination and limit."""
+        if self._adaptive_page_size is not None:
+            # The page token is the offset of the page
+            offset = next_page_token or self._resumed_checkpoint.get("offset", 0)
+            limit = self._adaptive_page_size.limit_at(offset)
+            return {
+                "page": offset // limit + 1,
+                "board_limit": limit,
+                "board_ids": self.board_ids(),
+            }
+
         return {
-            "page": next_page_token or 1,
+            "page": next_page_token or self._resumed_checkpoint.get("page", 1),
             "board_limit": self.config["board_limit"],
             "board_ids": self.board_ids(),
         }
@@ -42,7 +163,7 @@ class BoardsStream(MondayStream):
     @property
     def query(self) -> str:
         """Form Boards query."""
-        if self.board_ids():
+        if self.board_ids() is not None:
             ql_string = """
                 query Boards($board_limit: Int!, $page: Int!, $board_ids:[Int]) {
                     boards(
@@ -59,54 +180,281 @@ class BoardsStream(MondayStream):
                         page: $page,
                         order_by: created_at
             ) {
-                    id
-                    name
-                    description
-                    state
-                    updated_at
-                    workspace {
-                        id
-                        name
-                        kind
-                        description
-                    }
-                    owner {
-                        id
-                        name
-                        email
-                    }
+        """
+        ql_string += self.selection_set
+
+        for child in self.combined_child_streams:
+            ql_string += child.name + " {" + child.selection_set + "}"
+
+        ql_string += """
                 }
             }
         """
 
         return ql_string
 
+    @property
+    def combined_child_streams(self) -> List[MondayStream]:
+        """Return the child streams to fetch within the boards query.
+
+        Not with bounded memory, the children of a whole page would be held.
+        """
+        if self.memory_budget is not None:
+            return []
+
+        if not self.config.get("combined_board_fetch"):
+            return []
+
+        return [
+            cast(MondayStream, child)
+            for child in self.child_streams
+            if child.selected or child.has_selected_descendents
+        ]
+
     def get_child_context(self, record: dict, context: Optional[dict]) -> dict:
         """Allow GroupsStream and ItemsStream to query by board_id."""
         return {"board_id": record["id"]}
 
-    def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
-        """Convert types."""
+    def get_next_page_token(
+        self, response: requests.Response, previous_token: Optional[Any]
+    ) -> Any:
+        """Return the offset of the next page if the page size adapts."""
+        if self._adaptive_page_size is None:
+            return super().get_next_page_token(response, previous_token)
+
+        variables = json.loads(cast(bytes, response.request.body))["variables"]
+        complexity = getattr(response, "_complexity", None)
+        self._adaptive_page_size.observe(
+            response.elapsed.total_seconds(),
+            complexity["query"] if complexity else None,
+        )
+        if self.page_record_count(response) < variables["board_limit"]:
+            return None
+
+        return variables["page"] * variables["board_limit"]
+
+    def shrink_page(self, prepared_request: requests.PreparedRequest) -> None:
+        """Halve the page size, resizing the page of a request to be retried."""
+        page_size = cast(AdaptivePageSize, self._adaptive_page_size)
+        page_size.shrink()
+        payload = json.loads(cast(bytes, prepared_request.body))
+        variables = payload["variables"]
+        offset = (variables["page"] - 1) * variables["board_limit"]
+        limit = page_size.limit_at(offset)
+        variables.update(page=offset // limit + 1, board_limit=limit)
+        prepared_request.prepare_body(data=None, files=None, json=payload)
+
+    def _request(
+        self, prepared_request: requests.PreparedRequest, context: Optional[dict]
+    ) -> requests.Response:
+        """Send the request, with a smaller page before it is retried on timeout."""
+        try:
+            return super()._request(prepared_request, context)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if self._adaptive_page_size is not None:
+                self.shrink_page(prepared_request)
+            raise
+
+    def validate_response(self, response: requests.Response) -> None:
+        """Retry pages with server and complexity errors with a smaller size."""
+        if self._adaptive_page_size is None:
+            super().validate_response(response)
+            return
+
+        if 500 <= response.status_code < 600:
+            self.shrink_page(response.request)
+        elif response.status_code == 200:
+            for error in self.response_errors(response):
+                message = error.get("message", "")
+                if MAX_COMPLEXITY_RE.search(message):
+                    self.shrink_page(response.request)
+                    raise RetriableAPIError(message)
+        super().validate_response(response)
+
+    def page_position(self, response: requests.Response) -> int:
+        """Return the page number, or the offset if the page size adapts."""
+        variables = json.loads(cast(bytes, response.request.body))["variables"]
+        if self._adaptive_page_size is not None:
+            return (variables["page"] - 1) * variables["board_limit"]
+
+        return variables["page"]
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse boards, noting the page of each one for checkpoints."""
+        if not self.config.get("resume_interrupted_sync"):
+            yield from super().parse_response(response)
+            return
+
+        position = self.page_position(response)
+        for board in super().parse_response(response):
+            self._board_pages[int(board["id"])] = position
+            yield board
+
+    def should_sync_child(self, child: MondayStream, child_context: dict) -> bool:
+        """Skip children of boards not updated since they were last synced.
+
+        Children synced before an interrupted sync stopped are skipped too.
+        """
+        if not super().should_sync_child(child, child_context):
+            return False
+
+        board_id = child_context["board_id"]
+        if board_id in self._resumed_checkpoint.get("completed_boards", []):
+            return False
+
+        if not self.config.get("skip_unchanged_boards"):
+            return True
+
+        bookmarks = self.stream_state.get(CHILD_BOOKMARKS_KEY, {})
+        bookmark = bookmarks.get(child.name, {}).get(str(board_id))
+        updated_at = self._board_updated_at.get(board_id)
+        return bookmark is None or updated_at is None or updated_at > bookmark
+
+    def _sync_children(self, child_context: dict) -> None:
+        """Sync child streams, noting the updated_at of the board for them."""
+        if self.config.get("skip_unchanged_boards"):
+            board_id = child_context["board_id"]
+            for child in self.child_streams:
+                if self.should_sync_child(cast(MondayStream, child), child_context):
+                    synced = self._synced_child_bookmarks.setdefault(child.name, {})
+                    synced[str(board_id)] = self._board_updated_at[board_id]
+
+        super()._sync_children(child_context)
+
+        if self.config.get("resume_interrupted_sync"):
+            self._unfinished_boards.append(child_context["board_id"])
+            if not any(self._child_batches.values()):
+                # No child batch is waiting for more boards
+                self._save_checkpoint()
+
+    def _save_checkpoint(self) -> None:
+        """Mark the boards whose children were synced as completed in the state."""
+        # Pages of an adapting size are checkpointed by their offset
+        key = "page" if self._adaptive_page_size is None else "offset"
+        checkpoint = self.stream_state.get(self.checkpoint_key) or {
+            key: 1 if key == "page" else 0,
+            "completed_boards": [],
+        }
+        for board_id in self._unfinished_boards:
+            page = self._board_pages[board_id]
+            if page != checkpoint[key]:
+                checkpoint = {key: page, "completed_boards": []}
+            if board_id not in checkpoint["completed_boards"]:
+                checkpoint["completed_boards"].append(board_id)
+
+        if key == "page" and (
+            len(checkpoint["completed_boards"]) >= self.config["board_limit"]
+        ):
+            checkpoint = {"page": checkpoint["page"] + 1, "completed_boards": []}
+
+        self.stream_state[self.checkpoint_key] = checkpoint
+        self._unfinished_boards = []
+        self._save_child_bookmarks()
+        self._write_state_message()
+
+    def _save_child_bookmarks(self) -> None:
+        """Store the updated_at of the boards whose children were synced."""
+        bookmarks = self.stream_state.setdefault(CHILD_BOOKMARKS_KEY, {})
+        for child_name, synced in self._synced_child_bookmarks.items():
+            bookmarks.setdefault(child_name, {}).update(synced)
+        self._synced_child_bookmarks = {}
+
+    def _sync_records(self, context: Optional[dict] = None) -> None:
+        """Sync boards, then bookmark the boards whose children were synced.
+
+        Resumes from the checkpoint of an interrupted sync if enabled, the
+        checkpoint is removed once all boards are synced.
+        """
+        if self.shard_processes > 1 and self.shard is None:
+            self._sync_shards()
+            return
+
+        if self.board_ids() == []:
+            self.logger.info("None of the board_ids fall in this shard")
+            return
+
+        if self.config.get("resume_interrupted_sync"):
+            self._resumed_checkpoint = self.stream_state.get(self.checkpoint_key) or {}
+            if self._resumed_checkpoint:
+                self.logger.info(
+                    f"Resuming interrupted sync from {self._resumed_checkpoint}"
+                )
+
+        super()._sync_records(context)
+        if self.column_cache is not None:
+            self.column_cache.save()
+
+        # Only once the batches of children are synced as well
+        if self._synced_child_bookmarks or self.checkpoint_key in self.stream_state:
+            self._save_child_bookmarks()
+            self.stream_state.pop(self.checkpoint_key, None)
+            self._resumed_checkpoint = {}
+            self._write_state_message()
+
+    def _sync_shards(self) -> None:
+        """Sync the boards in shard_processes tap processes, merging their output.
+
+        Each process gets the state without the checkpoints of other shards,
+        so a checkpoint removed by its shard stays removed once merged.
+        """
+        count = self.shard_processes
+        states = []
+        for index in range(count):
+            state = copy.deepcopy(self.tap_state)
+            boards_state = state.get("bookmarks", {}).get(self.name, {})
+            for other in range(count):
+                if other != index:
+                    boards_state.pop(shard_key(CHECKPOINT_KEY, (other, count)), None)
+            states.append(state)
+
+        def write_state(state: dict) -> None:
+            self.tap_state.clear()
+            self.tap_state.update(state)
+            self._write_state_message()
+
+        write_state(
+            run_shards(
+                {**self.config, "shard_processes": count},
+                cast(Tap, self._tap).catalog_dict,
+                states,
+                sys.stdout,
+                write_state,
+                {self.name},
+            )
+        )
+
+    def post_process(self, row: dict, context: Optional[dict] = None) -> Optional[dict]:
+        """Convert types, leaving out the boards of other shards."""
         row["id"] = int(row["id"])
+        if not in_shard(row["id"], self.shard):
+            return None
+
         row["tapped_at"] = self.tapped_at()
+        if self.config.get("skip_unchanged_boards"):
+            self._board_updated_at[row["id"]] = row["updated_at"]
+        if self.column_cache is not None:
+            self.column_cache.observe_board(row["id"], row.get("updated_at"))
 
-        workspace = row.pop("workspace")
-        if workspace is not None:
-            row["workspace_id"] = int(workspace["id"])
-            row["workspace_name"] = workspace["name"]
-        else:
-            row["workspace_id"] = 0
-            row["workspace_name"] = ""
+        for child in self.combined_child_streams:
+            child_context = self.get_child_context(row, context)
+            child_rows = row.pop(child.name)
+            if self.should_sync_child(child, child_context):
+                child.preload_records(child_context, child_rows)
+
+        # Nested objects only hold the fields selected in the catalog
+        workspace = row.pop("workspace", None) or {}
+        row["workspace_id"] = int(workspace.get("id", 0))
+        row["workspace_name"] = workspace.get("name", "")
 
-        owner = row.pop("owner")
-        row["owner_id"] = owner["id"]
-        row["owner_name"] = owner["name"]
-        row["owner_email"] = owner["email"]
+        owner = row.pop("owner", {})
+        for field in ("id", "name", "email"):
+            if field in owner:
+                row[f"owner_{field}"] = owner[field]
 
         return row
 
 
-class GroupsStream(MondayStream):
+class GroupsStream(BoardBatchedStream):
     """Loads board groups."""
 
     name = "groups"
@@ -117,46 +465,25 @@ class GroupsStream(MondayStream):
 
     parent_stream_type = BoardsStream
     ignore_parent_replication_key = True
-
-    def get_url_params(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Dict[str, Any]:
-        """Get board_ids from the context."""
-        ctx: dict = cast(dict, context)
-        return {
-            "board_ids": ctx["board_id"],
-        }
-
-    @property
-    def query(self) -> str:
-        """Form Groups query."""
-        return """
-            query Groups($board_ids: [Int]) {
-                boards(ids: $board_ids) {
-                    id
-                    groups {
-                        id
-                        title
-                        position
-                        color
-                        deleted
-                    }
-                }
-            }
-        """
-
-    def parse_response(self, response: requests.Response) -> Iterable[dict]:
-        """Parse groups response."""
-        resp_json = response.json()
-        for row in resp_json["data"]["boards"]:
-            for group in row["groups"]:
-                yield group
+    detect_changes = True
+    board_field = "groups"
+    property_fields = {
+        "id": "id",
+        "title": "title",
+        "position": "position",
+        "color": "color",
+        "deleted": "deleted",
+    }
 
     def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
         """Convert types."""
         ctx: dict = cast(dict, context)
-        row["board_id"] = ctx["board_id"]
-        row["position"] = float(row["position"])
+        if "board_id" in ctx:
+            row["board_id"] = ctx["board_id"]
+        else:
+            row["board_id"] = int(row["board_id"])
+        if "position" in row:
+            row["position"] = float(row["position"])
         row["tapped_at"] = self.tapped_at()
         return row
 
@@ -172,52 +499,144 @@ class ItemsStream(MondayStream):
 
     parent_stream_type = BoardsStream
     ignore_parent_replication_key = True
+    property_fields = {
+        "id": "id",
+        "name": "name",
+        "state": "state",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+        "creator_id": "creator_id",
+        "creator_email": "creator.email",
+        "creator_name": "creator.name",
+        "group_id": "group.id",
+        "parent_item_id": "parent_item.id",
+    }
+
+    @property
+    def page_size(self) -> Optional[int]:
+        """Return the number of items per page if item pagination is enabled."""
+        if self.config.get("paginate_items"):
+            return self.config["item_limit"]
+
+        return None
 
     def get_url_params(
         self, context: Optional[dict], next_page_token: Optional[Any]
     ) -> Dict[str, Any]:
-        """Get board_ids from the context."""
+        """Get board_ids from the context, and the page if paginated."""
         ctx: dict = cast(dict, context)
-        return {
+        params: Dict[str, Any] = {
             "board_ids": ctx["board_id"],
         }
+        if self.page_size is not None:
+            params["item_limit"] = self.page_size
+            params["page"] = next_page_token or 1
+
+        return params
 
     @property
     def query(self) -> str:
         """Form Items query."""
-        return """
-            query Items($board_ids: [Int]) {
-                boards(ids: $board_ids) {
-                    id
-                    items {
+        if self.page_size is not None:
+            ql_string = """
+                query Items($board_ids: [Int], $item_limit: Int!, $page: Int!) {
+                    boards(ids: $board_ids) {
                         id
-                        name
-                        state
-                        created_at
-                        updated_at
-                        creator_id
-                        creator {
-                            email
-                            name
-                        }
-                        group {
-                            id
-                        }
-                        parent_item {
-                            id
-                        }
+                        items(limit: $item_limit, page: $page) {
+            """
+        else:
+            ql_string = """
+                query Items($board_ids: [Int]) {
+                    boards(ids: $board_ids) {
+                        id
+                        items {
+            """
+
+        ql_string += self.selection_set
+        ql_string += """
                     }
                 }
             }
         """
 
+        return ql_string
+
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse groups response."""
-        resp_json = response.json()
-        for row in resp_json["data"]["boards"]:
-            for item in row["items"]:
+        for _, item in self.iter_response(response, "boards", "items"):
+            yield item
+
+    def fetch_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Request all items, or only the ones updated since the bookmark."""
+        ctx: dict = cast(dict, context)
+        bookmark = None
+        if self.config.get("incremental_items"):
+            # Read without creating the partition, prefetching runs in threads
+            bookmark = get_state_if_exists(
+                self.tap_state, self.name, ctx, "replication_key_value"
+            )
+        if bookmark is None:
+            yield from super().fetch_records(context)
+            return
+
+        item_ids = sorted(self.updated_item_ids(ctx["board_id"], bookmark, ctx))
+        limit = int(self.config["item_limit"])
+        for start in range(0, len(item_ids), limit):
+            end = start + limit
+            batch = item_ids[start:end]
+            response = self.request_query(
+                """
+                query UpdatedItems($item_ids: [Int], $item_limit: Int) {
+                    items(ids: $item_ids, limit: $item_limit) {
+                """
+                + self.selection_set
+                + """
+                    }
+                }
+                """,
+                {"item_ids": batch, "item_limit": len(batch)},
+                context,
+            )
+            for _, item in self.iter_response(response, "items"):
                 yield item
 
+    def updated_item_ids(self, board_id: int, since: str, context: dict) -> Set[int]:
+        """Return the IDs of the items with activity on the board since a time."""
+        item_ids: Set[int] = set()
+        page = 1
+        while True:
+            response = self.request_query(
+                """
+                query ItemActivity(
+                    $board_ids: [Int], $from: ISO8601DateTime, $limit: Int, $page: Int
+                ) {
+                    boards(ids: $board_ids) {
+                        activity_logs(from: $from, limit: $limit, page: $page) {
+                            data
+                        }
+                    }
+                }
+                """,
+                {
+                    "board_ids": board_id,
+                    "from": since,
+                    "limit": ACTIVITY_LOGS_PER_PAGE,
+                    "page": page,
+                },
+                context,
+            )
+            count = 0
+            for _, log in self.iter_response(response, "boards", "activity_logs"):
+                count += 1
+                # Item events refer to the item as a pulse
+                pulse_id = json.loads(log["data"] or "{}").get("pulse_id")
+                if pulse_id is not None:
+                    item_ids.add(int(pulse_id))
+
+            if count < ACTIVITY_LOGS_PER_PAGE:
+                return item_ids
+            page += 1
+
     def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
         """Add and convert fields."""
         row["id"] = int(row["id"])
@@ -225,19 +644,21 @@ class ItemsStream(MondayStream):
         ctx: dict = cast(dict, context)
         row["board_id"] = ctx["board_id"]
 
-        row["group_id"] = row["group"]["id"]
+        # Fields deselected in the catalog are not queried
+        if "group" in row:
+            row["group_id"] = row["group"]["id"]
 
-        parent_item = row.pop("parent_item")
-        row["parent_item_id"] = 0 if parent_item is None else int(parent_item["id"])
+        if "parent_item" in row:
+            parent_item = row.pop("parent_item")
+            row["parent_item_id"] = 0 if parent_item is None else int(parent_item["id"])
 
-        row["creator_id"] = int(row["creator_id"])
-        creator = row.pop("creator")
-        if creator is not None:
-            row["creator_email"] = creator["email"]
-            row["creator_name"] = creator["name"]
-        else:
-            row["creator_email"] = ""
-            row["creator_name"] = ""
+        if "creator_id" in row:
+            row["creator_id"] = int(row["creator_id"])
+
+        if "creator" in row:
+            creator = row.pop("creator") or {}
+            row["creator_email"] = creator.get("email", "")
+            row["creator_name"] = creator.get("name", "")
 
         row["tapped_at"] = self.tapped_at()
         return row
@@ -247,7 +668,7 @@ class ItemsStream(MondayStream):
         return {"item_id": int(record["id"])}
 
 
-class ColumnsStream(MondayStream):
+class ColumnsStream(BoardBatchedStream):
     """Loads columns."""
 
     name = "columns"
@@ -257,53 +678,70 @@ class ColumnsStream(MondayStream):
 
     parent_stream_type = BoardsStream
     ignore_parent_replication_key = True
+    detect_changes = True
+    board_field = "columns"
+    property_fields = {
+        "id": "id",
+        "title": "title",
+        "archived": "archived",
+        "settings_str": "settings_str",
+        "description": "description",
+        "type": "type",
+        "width": "width",
+    }
+
+    @property
+    def selection_set(self) -> str:
+        """Query all fields of columns that are cached, for any selection."""
+        if self.column_cache is not None:
+            return build_selection_set(list(self.property_fields.values()))
+
+        return super().selection_set
+
+    def fetch_records(self, context: Optional[dict]) -> Iterable[dict]:
+        """Return the cached columns of boards, and request the others."""
+        cache = self.column_cache
+        if cache is None:
+            yield from super().fetch_records(context)
+            return
 
-    def get_url_params(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Dict[str, Any]:
-        """Get board_ids from the context."""
         ctx: dict = cast(dict, context)
-        return {
-            "board_ids": ctx["board_id"],
-        }
+        missing: Dict[int, List[dict]] = {}
+        for board_id in ctx.get("board_ids") or [ctx["board_id"]]:
+            columns = cache.get(board_id)
+            if columns is None:
+                missing[board_id] = []
+                continue
 
-    @property
-    def query(self) -> str:
-        """Form Columns query."""
-        return """
-            query Columns($board_ids: [Int]) {
-                boards(ids: $board_ids) {
-                    id
-                    columns {
-                        id
-                        title
-                        archived
-                        settings_str
-                        description
-                        type
-                        width
-                    }
-                }
-            }
-        """
+            for column in columns:
+                yield {**column, "board_id": str(board_id)}
 
-    def parse_response(self, response: requests.Response) -> Iterable[dict]:
-        """Parse groups response."""
-        resp_json = response.json()
-        for row in resp_json["data"]["boards"]:
-            for column in row["columns"]:
-                yield column
+        if not missing:
+            return
+
+        if "board_ids" in ctx:
+            context = {"board_ids": list(missing)}
+        for row in super().fetch_records(context):
+            column = {key: value for key, value in row.items() if key != "board_id"}
+            missing[int(row["board_id"])].append(column)
+            yield row
+
+        for board_id, columns in missing.items():
+            cache.put(board_id, columns)
 
     def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
         """Convert types."""
         ctx: dict = cast(dict, context)
 
-        row["board_id"] = ctx["board_id"]
+        if "board_id" in ctx:
+            row["board_id"] = ctx["board_id"]
+        else:
+            row["board_id"] = int(row["board_id"])
         row["tapped_at"] = self.tapped_at()
         return row
 
 
-class ColumnValuesStream(MondayStream):
+class ColumnValuesStream(ItemBatchedStream):
     """Loads column values."""
 
     name = "column_values"
@@ -313,58 +751,299 @@ class ColumnValuesStream(MondayStream):
     replication_key = None
 
     parent_stream_type = ItemsStream
-    ignore_parent_replication_key = True
+    detect_changes = True
+    property_fields = {
+        "id": "id",
+        "title": "title",
+        "text": "text",
+        "type": "type",
+        "value": "value",
+        "additional_info": "additional_info",
+        "description": "description",
+    }
 
-    def get_url_params(
-        self, context: Optional[dict], next_page_token: Optional[Any]
-    ) -> Dict[str, Any]:
-        """Get board_ids from the context."""
-        ctx: dict = cast(dict, context)
-        return {
-            "item_ids": ctx["item_id"],
-        }
+    @property
+    def selection_set(self) -> str:
+        """Leave out the column attributes that come from the column cache."""
+        if self.column_cache is None:
+            return super().selection_set
+
+        fields = [
+            field
+            for prop, field in self.property_fields.items()
+            if prop not in COLUMN_ATTRIBUTES
+            and self.mask.get(("properties", prop), True)
+        ]
+        return build_selection_set(fields)
+
+    def cached_column(self, board_id: int, column_id: str) -> dict:
+        """Return a column of a board, requesting the columns on a cache miss."""
+        cache = cast(ColumnCache, self.column_cache)
+        column = cache.get_column(board_id, column_id)
+        if column is not None:
+            return column
+
+        response = self.request_query(
+            """
+            query ColumnDefinitions($board_ids: [Int]) {
+                boards(ids: $board_ids) {
+                    columns {
+            """
+            + build_selection_set(list(ColumnsStream.property_fields.values()))
+            + """
+                    }
+                }
+            }
+            """,
+            {"board_ids": board_id},
+            None,
+        )
+        cache.put(
+            board_id,
+            [column for _, column in self.iter_response(response, "boards", "columns")],
+        )
+        return cache.get_column(board_id, column_id) or {}
 
     @property
     def query(self) -> str:
         """Form ColumnValues query."""
-        return """
-            query ColumnValues($item_ids: [Int]) {
-                items(ids: $item_ids) {
+        if self.context_batch_size > 1:
+            ql_string = """
+                query ColumnValues($item_ids: [Int], $item_limit: Int) {
+                    items(ids: $item_ids, limit: $item_limit) {
+            """
+        else:
+            ql_string = """
+                query ColumnValues($item_ids: [Int]) {
+                    items(ids: $item_ids) {
+            """
+
+        ql_string += """
                     id
+        """
+        if self.column_cache is not None:
+            # Column attributes of the values are looked up by board
+            ql_string += "board { id }"
+        ql_string += """
                     column_values {
-                        id
-                        title
-                        text
-                        type
-                        value
-                        additional_info
-                        description
+        """
+        ql_string += self.selection_set
+        ql_string += """
                     }
                 }
             }
         """
 
+        return ql_string
+
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse groups response."""
-        resp_json = response.json()
-        for row in resp_json["data"]["items"]:
-            for column_value in row["column_values"]:
-                yield column_value
+        cache = self.column_cache
+        for item, column_value in self.iter_response(
+            response, "items", "column_values"
+        ):
+            # Tells the items of a batch apart in post_process
+            column_value["item_id"] = item["id"]
+            if cache is not None:
+                column = self.cached_column(
+                    int(item["board"]["id"]), column_value["id"]
+                )
+                for attribute in COLUMN_ATTRIBUTES:
+                    column_value[attribute] = column.get(attribute)
+            yield column_value
 
     def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
         """Convert types."""
         ctx: dict = cast(dict, context)
-        row["item_id"] = ctx["item_id"]
-
-        if row["value"] is None:
-            row["value"] = ""
+        if "item_id" in ctx:
+            row["item_id"] = ctx["item_id"]
         else:
-            row["value"] = json.dumps(row["value"])
+            row["item_id"] = int(row["item_id"])
 
-        if row["additional_info"] is None:
-            row["additional_info"] = ""
-        else:
-            row["additional_info"] = json.dumps(row["additional_info"])
+        # Fields deselected in the catalog are not queried
+        if "value" in row:
+            if row["value"] is None:
+                row["value"] = ""
+            else:
+                row["value"] = dumps_value(row["value"])
+
+        if "additional_info" in row:
+            if row["additional_info"] is None:
+                row["additional_info"] = ""
+            else:
+                row["additional_info"] = dumps_value(row["additional_info"])
+
+        row["tapped_at"] = self.tapped_at()
+        return row
+
+
+class ItemWideStream(ItemBatchedStream):
+    """Loads items with the text and value of each column as fields."""
+
+    name = "item_wide"
+    schema_filepath = SCHEMAS_DIR / "item_wide.json"
+
+    primary_keys = ["item_id"]
+
+    parent_stream_type = ItemsStream
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the stream, its columns are added once the schema is used."""
+        super().__init__(*args, **kwargs)
+        self._item_fields = frozenset(self._schema["properties"])
+        self._columns_pending = True
+
+    @property
+    def schema(self) -> dict:
+        """Return the schema, with a field per column of the boards synced."""
+        if getattr(self, "_columns_pending", False):
+            self._columns_pending = False
+            self.add_column_fields()
+        return self._schema
+
+    def add_column_fields(self) -> None:
+        """Add the fields of the columns, from the input catalog if there is one.
+
+        Only without a catalog, e.g. on discovery, are the columns requested.
+        A stream left out of the catalog gets no column fields.
+        """
+        properties = self._schema["properties"]
+        catalog = cast(Tap, self._tap).input_catalog
+        if catalog is not None:
+            entry = catalog.get_stream(self.name)
+            if entry is not None and entry.schema.properties:
+                for field, schema in entry.schema.to_dict()["properties"].items():
+                    properties.setdefault(field, schema)
+            return
 
+        for column_id in self.discover_column_ids():
+            field = self.column_field(column_id)
+            properties[field] = {"type": ["string", "null"]}
+            properties[f"{field}_value"] = {"type": ["string", "null"]}
+
+    def column_field(self, column_id: str) -> str:
+        """Return the field of a column, prefixed if it would replace an item field."""
+        if {column_id, f"{column_id}_value"} & self._item_fields:
+            return f"column_{column_id}"
+
+        return column_id
+
+    def discover_column_ids(self) -> List[str]:
+        """Return the IDs of the columns of the boards synced.
+
+        With the column cache, only boards updated since their columns were
+        cached are asked for their columns.
+        """
+        board_ids = shard_board_ids(self.config)
+        if board_ids == []:
+            return []
+
+        cache = self.column_cache
+        column_ids: Dict[str, None] = {}
+        uncached: List[int] = []
+        board_limit = int(self.config["board_limit"])
+        page = 1
+        while True:
+            response = self.request_query(
+                """
+                query ItemWideColumns(
+                    $board_ids: [Int], $board_limit: Int!, $page: Int!
+                ) {
+                    boards(ids: $board_ids, limit: $board_limit, page: $page) {
+                """
+                + ("id updated_at" if cache is not None else "id columns { id }")
+                + """
+                    }
+                }
+                """,
+                {"board_ids": board_ids, "board_limit": board_limit, "page": page},
+                None,
+            )
+            boards = [board for _, board in self.iter_response(response, "boards")]
+            for board in boards:
+                board_id = int(board["id"])
+                if not in_shard(board_id, get_shard(self.config)):
+                    continue
+
+                columns = board.get("columns")
+                if cache is not None:
+                    cache.observe_board(board_id, board.get("updated_at"))
+                    columns = cache.get(board_id)
+                if columns is None:
+                    uncached.append(board_id)
+                else:
+                    column_ids.update(dict.fromkeys(col["id"] for col in columns))
+            if len(boards) < board_limit:
+                break
+            page += 1
+
+        for start in range(0, len(uncached), board_limit):
+            end = start + board_limit
+            chunk = uncached[start:end]
+            response = self.request_query(
+                """
+                query ItemWideColumnDefinitions(
+                    $board_ids: [Int], $board_limit: Int!
+                ) {
+                    boards(ids: $board_ids, limit: $board_limit) {
+                        id columns {
+                """
+                + build_selection_set(list(ColumnsStream.property_fields.values()))
+                + """
+                        }
+                    }
+                }
+                """,
+                {"board_ids": chunk, "board_limit": board_limit},
+                None,
+            )
+            for _, board in self.iter_response(response, "boards"):
+                if cache is not None:
+                    cache.put(int(board["id"]), board["columns"])
+                column_ids.update(dict.fromkeys(col["id"] for col in board["columns"]))
+
+        if cache is not None and uncached:
+            cache.save()
+        return list(column_ids)
+
+    @property
+    def query(self) -> str:
+        """Form ItemWide query."""
+        if self.context_batch_size > 1:
+            return """
+                query ItemWide($item_ids: [Int], $item_limit: Int) {
+                    items(ids: $item_ids, limit: $item_limit) {
+                        id board { id } column_values { id text value }
+                    }
+                }
+            """
+
+        return """
+            query ItemWide($item_ids: [Int]) {
+                items(ids: $item_ids) {
+                    id board { id } column_values { id text value }
+                }
+            }
+        """
+
+    def parse_response(self, response: requests.Response) -> Iterable[dict]:
+        """Parse an item into a record with a field per column."""
+        properties = self.schema["properties"]
+        for _, item in self.iter_response(response, "items"):
+            row: Dict[str, Any] = {
+                "item_id": int(item["id"]),
+                "board_id": int(item["board"]["id"]),
+            }
+            for column_value in item["column_values"]:
+                field = self.column_field(column_value["id"])
+                # Columns added since the schema was discovered are left out
+                if field in properties:
+                    value = column_value["value"]
+                    row[field] = column_value["text"]
+                    row[f"{field}_value"] = "" if value is None else dumps_value(value)
+            yield row
+
+    def post_process(self, row: dict, context: Optional[dict] = None) -> dict:
+        """Add tapped_at."""
         row["tapped_at"] = self.tapped_at()
         return row
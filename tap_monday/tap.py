@@ -1,17 +1,31 @@
 """Monday tap class."""
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional
 
+from requests.adapters import BaseAdapter
 from singer_sdk import Tap, Stream
 from singer_sdk import typing as th  # JSON schema typing helpers
 
+from tap_monday.batch import BatchWriter
+from tap_monday.cassette import cassette_adapter
+from tap_monday.client import TAPPED_AT_FORMAT
+from tap_monday.column_cache import ColumnCache
+from tap_monday.memory import MemoryBudget
+from tap_monday.metrics import RequestMetrics
+from tap_monday.record_hashes import RecordHashes
+from tap_monday.rate_limit import ComplexityRateLimiter, TokenPool
+from tap_monday.serialization import RecordWriter
 from tap_monday.streams import (
     BoardsStream,
     ColumnsStream,
     GroupsStream,
     ItemsStream,
     ColumnValuesStream,
+    ItemWideStream,
 )
+from tap_monday.transport import PooledHTTPAdapter
 
 STREAM_TYPES = [
     BoardsStream,
@@ -27,6 +41,18 @@ class TapMonday(Tap):
 
     name = "tap-monday"
 
+    _worker_pool: Optional[ThreadPoolExecutor] = None
+    _rate_limiter: Optional[ComplexityRateLimiter] = None
+    _token_pool: Optional[TokenPool] = None
+    _request_metrics: Optional[RequestMetrics] = None
+    _record_writer: Optional[RecordWriter] = None
+    _batch_writer: Optional[BatchWriter] = None
+    _memory_budget: Optional[MemoryBudget] = None
+    _run_tapped_at: Optional[str] = None
+    _http_adapter: Optional[BaseAdapter] = None
+    _column_cache: Optional[ColumnCache] = None
+    _record_hashes: Optional[RecordHashes] = None
+
     config_jsonschema = th.PropertiesList(
         th.Property(
             "auth_token",
@@ -34,6 +60,14 @@ class TapMonday(Tap):
             required=True,
             description="The token to authenticate against the API service",
         ),
+        th.Property(
+            "auth_tokens",
+            th.ArrayType(th.StringType),
+            description=(
+                "More tokens to take turns with, each with its own rate limit, "
+                "a throttled one is skipped until it is lifted"
+            ),
+        ),
         th.Property(
             "api_url",
             th.StringType,
@@ -46,20 +80,448 @@ class TapMonday(Tap):
             default=10,
             description="Amount of boards to request per page",
         ),
+        th.Property(
+            "adaptive_board_limit",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Start with board_limit boards per page, doubling it while pages "
+                "stay under the target latency and complexity and halving it "
+                "after timeouts, server errors and complexity errors"
+            ),
+        ),
+        th.Property(
+            "min_board_limit",
+            th.NumberType,
+            default=1,
+            description="Least amount of boards per page with adaptive_board_limit",
+        ),
+        th.Property(
+            "max_board_limit",
+            th.NumberType,
+            default=100,
+            description="Most boards per page with adaptive_board_limit",
+        ),
+        th.Property(
+            "board_page_target_seconds",
+            th.NumberType,
+            default=10,
+            description="Latency of a page of boards to stay under when adapting",
+        ),
+        th.Property(
+            "board_page_target_complexity",
+            th.NumberType,
+            default=1000000,
+            description="Complexity of a page of boards to stay under when adapting",
+        ),
+        th.Property(
+            "board_batch_size",
+            th.NumberType,
+            default=1,
+            description="Amount of boards to request groups and columns for at once",
+        ),
+        th.Property(
+            "combined_board_fetch",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Query groups, columns and items within the boards query "
+                "instead of one query per board for each of them"
+            ),
+        ),
         th.Property(
             "item_limit",
             th.NumberType,
             default=10,
             description="Amount of items to request per page",
         ),
+        th.Property(
+            "paginate_items",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Request the items of a board in pages of item_limit items "
+                "instead of all at once"
+            ),
+        ),
+        th.Property(
+            "incremental_items",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Only request the items of a board with activity since the "
+                "bookmark of the board in the state"
+            ),
+        ),
+        th.Property(
+            "item_wide_stream",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Add the item_wide stream, a record per item with the text and "
+                "value of each column of the boards as fields"
+            ),
+        ),
         th.Property(
             "column_value_limit",
             th.NumberType,
             default=10,
             description="Amount of items to request per page for column values",
         ),
+        th.Property(
+            "batch_column_values",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Query column values for column_value_limit items per request "
+                "instead of one request per item"
+            ),
+        ),
+        th.Property(
+            "max_workers",
+            th.NumberType,
+            default=1,
+            description=(
+                "Amount of requests for child streams of upcoming boards and "
+                "items to run at the same time"
+            ),
+        ),
+        th.Property(
+            "shard_processes",
+            th.NumberType,
+            default=1,
+            description=(
+                "Amount of tap processes to split the boards across, their "
+                "output is merged into one"
+            ),
+        ),
+        th.Property(
+            "shard_index",
+            th.NumberType,
+            description="Shard of the boards synced, set for the shard processes",
+        ),
+        th.Property(
+            "http_pool_size",
+            th.NumberType,
+            default=10,
+            description="Connections to the API to keep open for reuse in the run",
+        ),
+        th.Property(
+            "http_connect_timeout",
+            th.NumberType,
+            default=30,
+            description="Seconds to wait for a connection to the API",
+        ),
+        th.Property(
+            "http_read_timeout",
+            th.NumberType,
+            default=300,
+            description="Seconds to wait for a response of the API",
+        ),
+        th.Property(
+            "tcp_keepalive_seconds",
+            th.NumberType,
+            default=0,
+            description=(
+                "Probe connections idle for this many seconds with TCP keep-alive, "
+                "0 to leave it to the system"
+            ),
+        ),
+        th.Property(
+            "cassette_path",
+            th.StringType,
+            description=(
+                "Directory to record API responses to, or to replay them from "
+                "without network access, see cassette_mode"
+            ),
+        ),
+        th.Property(
+            "cassette_mode",
+            th.StringType,
+            default="replay",
+            description=(
+                "record to save the responses of the run to cassette_path, "
+                "replay to serve them from it"
+            ),
+        ),
+        th.Property(
+            "complexity_rate_limit",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Pace requests by the per-minute complexity budget and retry "
+                "rate limited ones as soon as the budget resets"
+            ),
+        ),
+        th.Property(
+            "resume_interrupted_sync",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Keep a checkpoint of the board page and the boards whose "
+                "children are synced in the state, to resume from if the run "
+                "is interrupted"
+            ),
+        ),
+        th.Property(
+            "skip_unchanged_boards",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Only sync groups, columns and items of boards updated since "
+                "they were last synced, as bookmarked in the state"
+            ),
+        ),
+        th.Property(
+            "column_cache_path",
+            th.StringType,
+            description=(
+                "JSON file to cache column definitions of boards in, they are "
+                "requested again once a board is updated"
+            ),
+        ),
+        th.Property(
+            "change_detection_path",
+            th.StringType,
+            description=(
+                "JSON file to keep content hashes of groups, columns and column "
+                "values in, only records that changed since the last run are "
+                "synced"
+            ),
+        ),
+        th.Property(
+            "emit_tombstones",
+            th.BooleanType,
+            default=False,
+            description=(
+                "With change detection, sync records that are gone since the "
+                "last run with only their keys and _sdc_deleted_at"
+            ),
+        ),
+        th.Property(
+            "metrics_path",
+            th.StringType,
+            description=(
+                "JSON file to write a per-stream summary of the request "
+                "metrics to at the end of the run"
+            ),
+        ),
+        th.Property(
+            "stream_responses",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Parse records while the response body is still being read "
+                "instead of loading the whole body first"
+            ),
+        ),
+        th.Property(
+            "bounded_memory",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Keep memory use flat: stream responses, fetch ahead only while "
+                "few records are held and drop the state of synced parents"
+            ),
+        ),
+        th.Property(
+            "max_buffered_records",
+            th.NumberType,
+            default=10000,
+            description=(
+                "With bounded_memory, records fetched ahead to hold in memory "
+                "before fetching pauses"
+            ),
+        ),
+        th.Property(
+            "max_rss_mb",
+            th.NumberType,
+            description=(
+                "With bounded_memory, resident memory in MB above which "
+                "fetching ahead pauses"
+            ),
+        ),
+        th.Property(
+            "tapped_at_per_run",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Set tapped_at of all records to the time the run started "
+                "instead of the time each record is processed"
+            ),
+        ),
+        th.Property(
+            "fast_serialization",
+            th.BooleanType,
+            default=False,
+            description=(
+                "Encode RECORD messages with pre-encoded stream fragments and "
+                "write them out in large buffered chunks"
+            ),
+        ),
+        th.Property(
+            "batch_root",
+            th.StringType,
+            description=(
+                "Directory or file:// URI to write records to as gzip JSONL "
+                "files, announced in BATCH messages instead of RECORD ones"
+            ),
+        ),
+        th.Property(
+            "batch_prefix",
+            th.StringType,
+            default="",
+            description="Prefix of the names of the batch files",
+        ),
+        th.Property(
+            "batch_max_rows",
+            th.NumberType,
+            default=1000000,
+            description="Records per batch file before it is rolled over",
+        ),
+        th.Property(
+            "batch_max_bytes",
+            th.NumberType,
+            default=100 * 1024 * 1024,
+            description=("Uncompressed bytes per batch file before it is rolled over"),
+        ),
     ).to_dict()
 
+    @property
+    def worker_pool(self) -> Optional[ThreadPoolExecutor]:
+        """Return the pool streams fetch child records ahead in, if enabled."""
+        max_workers = int(self.config["max_workers"])
+        if max_workers <= 1:
+            return None
+
+        if self._worker_pool is None:
+            self._worker_pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=self.name
+            )
+        return self._worker_pool
+
+    @property
+    def http_adapter(self) -> BaseAdapter:
+        """Return the adapter every session of the streams sends requests with.
+
+        Its connection pools are thread-safe, so http_pool_size caps the
+        connections kept open for the whole run.
+        """
+        if self._http_adapter is None:
+            adapter = PooledHTTPAdapter(
+                int(self.config["http_pool_size"]),
+                float(self.config["http_connect_timeout"]),
+                int(self.config.get("tcp_keepalive_seconds") or 0),
+            )
+            # Records or replays the responses, if enabled
+            self._http_adapter = cassette_adapter(self.config, adapter) or adapter
+        return self._http_adapter
+
+    @property
+    def rate_limiter(self) -> Optional[ComplexityRateLimiter]:
+        """Return the limiter streams pace requests with, if enabled."""
+        if not self.config.get("complexity_rate_limit"):
+            return None
+
+        if self._rate_limiter is None:
+            self._rate_limiter = ComplexityRateLimiter()
+        return self._rate_limiter
+
+    @property
+    def token_pool(self) -> Optional[TokenPool]:
+        """Return the tokens requests take turns with, if there are more."""
+        if not self.config.get("auth_tokens"):
+            return None
+
+        if self._token_pool is None:
+            self._token_pool = TokenPool(
+                [self.config["auth_token"]] + list(self.config["auth_tokens"])
+            )
+        return self._token_pool
+
+    @property
+    def column_cache(self) -> Optional[ColumnCache]:
+        """Return the cache of column definitions, if enabled."""
+        if not self.config.get("column_cache_path"):
+            return None
+
+        if self._column_cache is None:
+            self._column_cache = ColumnCache(self.config["column_cache_path"])
+        return self._column_cache
+
+    @property
+    def record_hashes(self) -> Optional[RecordHashes]:
+        """Return the content hashes of records, if change detection is enabled."""
+        if not self.config.get("change_detection_path"):
+            return None
+
+        if self._record_hashes is None:
+            self._record_hashes = RecordHashes(self.config["change_detection_path"])
+        return self._record_hashes
+
+    @property
+    def request_metrics(self) -> RequestMetrics:
+        """Return the metrics streams add their requests to."""
+        if self._request_metrics is None:
+            self._request_metrics = RequestMetrics()
+        return self._request_metrics
+
+    @property
+    def record_writer(self) -> Optional[RecordWriter]:
+        """Return the writer streams buffer RECORD messages in, if enabled."""
+        if not self.config.get("fast_serialization"):
+            return None
+
+        if self._record_writer is None:
+            self._record_writer = RecordWriter()
+        return self._record_writer
+
+    @property
+    def run_tapped_at(self) -> Optional[str]:
+        """Return the tapped_at of all records, if set once per run."""
+        if not self.config.get("tapped_at_per_run"):
+            return None
+
+        if self._run_tapped_at is None:
+            now = datetime.now(timezone.utc)
+            self._run_tapped_at = now.strftime(TAPPED_AT_FORMAT)
+        return self._run_tapped_at
+
+    @property
+    def memory_budget(self) -> Optional[MemoryBudget]:
+        """Return the budget of records streams fetch ahead, if memory is bounded."""
+        if not self.config.get("bounded_memory"):
+            return None
+
+        if self._memory_budget is None:
+            max_rss_mb = self.config.get("max_rss_mb")
+            self._memory_budget = MemoryBudget(
+                int(self.config["max_buffered_records"]),
+                float(max_rss_mb) if max_rss_mb else None,
+            )
+        return self._memory_budget
+
+    @property
+    def batch_writer(self) -> Optional[BatchWriter]:
+        """Return the writer streams write records to batch files with, if enabled."""
+        if not self.config.get("batch_root"):
+            return None
+
+        if self._batch_writer is None:
+            self._batch_writer = BatchWriter(
+                self.config["batch_root"],
+                self.config.get("batch_prefix") or "",
+                int(self.config["batch_max_rows"]),
+                int(self.config["batch_max_bytes"]),
+            )
+        return self._batch_writer
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
-        return [stream_class(tap=self) for stream_class in STREAM_TYPES]
+        streams: List[Stream] = [
+            stream_class(tap=self) for stream_class in STREAM_TYPES
+        ]
+        if self.config.get("item_wide_stream"):
+            # Its schema depends on the columns of the boards
+            streams.append(ItemWideStream(tap=self))
+        return streams
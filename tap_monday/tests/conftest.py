@@ -2,6 +2,8 @@
 
 import pytest
 
+from tap_monday.tap import TapMonday
+
 
 @pytest.fixture
 def fixture_boards():
@@ -226,3 +228,57 @@ def fixture_column_values_some_empty():
             ],
         }
     }
+
+
+@pytest.fixture
+def fixture_column_values_batch():
+    """Emulate Monday.com column values query response for several items."""
+    return {
+        "data": {
+            "items": [
+                {
+                    "id": "2274512428",
+                    "column_values": [
+                        {
+                            "id": "status",
+                            "title": "Status",
+                            "type": "color",
+                            "value": None,
+                            "text": "Done",
+                            "additional_info": None,
+                            "description": None,
+                        }
+                    ],
+                },
+                {
+                    "id": "2274512429",
+                    "column_values": [
+                        {
+                            "id": "status",
+                            "title": "Status",
+                            "type": "color",
+                            "value": None,
+                            "text": "Working on it",
+                            "additional_info": None,
+                            "description": None,
+                        }
+                    ],
+                },
+            ],
+        }
+    }
+
+
+@pytest.fixture
+def select_streams():
+    """Return a function making a catalog with only the named streams selected."""
+
+    def select(config, names):
+        catalog = TapMonday(config=config).catalog_dict
+        for entry in catalog["streams"]:
+            for metadata in entry["metadata"]:
+                if metadata["breadcrumb"] == []:
+                    metadata["metadata"]["selected"] = entry["tap_stream_id"] in names
+        return catalog
+
+    return select
@@ -0,0 +1,360 @@
+"""Local stand-in for the Monday.com GraphQL API with synthetic data."""
+
+import json
+import re
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[{}()]")
+OPERATION_RE = re.compile(r"^\s*query\s+(\w+)")
+
+UPDATED_AT = "2022-02-05T00:27:23Z"
+
+# Field names mapped to their selection sets, None for scalar fields
+Selection = Dict[str, Any]
+
+
+@dataclass
+class MockScale:
+    """Amount of synthetic objects and the behaviour of the server."""
+
+    boards: int = 10
+    groups_per_board: int = 3
+    columns_per_board: int = 5
+    items_per_board: int = 20
+    # Seconds every request takes before it is answered
+    latency: float = 0.0
+    # Complexity budget of each token per period, 0 for no rate limit
+    complexity_budget: int = 0
+    budget_period: float = 60.0
+    # Answer an exhausted budget with "429" or with an "error" in a 200 body
+    rate_limit_response: str = "error"
+
+    @property
+    def column_values(self) -> int:
+        """Return the amount of column values of all boards."""
+        return self.boards * self.items_per_board * self.columns_per_board
+
+
+def parse_selection(query: str) -> Selection:
+    """Parse the root selection set of a query, ignoring the arguments."""
+    tokens = iter(TOKEN_RE.findall(query))
+    for token in tokens:
+        if token == "{":  # Skips the operation name and variables
+            break
+
+    def selection_set() -> Selection:
+        fields: Selection = {}
+        last = ""
+        for token in tokens:
+            if token == "}":
+                return fields
+            elif token == "{":
+                fields[last] = selection_set()
+            elif token == "(":
+                for token in tokens:
+                    if token == ")":
+                        break
+            elif token != ")":
+                fields[token] = None
+                last = token
+        return fields
+
+    return selection_set()
+
+
+def project(value: Any, selection: Optional[Selection]) -> Any:
+    """Return the fields of a value in a selection set, resolving lazy ones."""
+    if callable(value):
+        value = value()
+    if selection is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(element, selection) for element in value]
+    return {name: project(value.get(name), sub) for name, sub in selection.items()}
+
+
+def count_objects(value: Any) -> int:
+    """Return the amount of objects in a response, the cost of a query."""
+    if isinstance(value, list):
+        return sum(count_objects(element) for element in value)
+    if isinstance(value, dict):
+        return 1 + sum(count_objects(element) for element in value.values())
+    return 0
+
+
+class MockMonday:
+    """Synthetic Monday.com account answering the queries of the tap."""
+
+    def __init__(self, scale: MockScale) -> None:
+        """Initialize the account and its request counters."""
+        self.scale = scale
+        self.requests: Dict[str, int] = {}
+        self.token_requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Budget used and when it resets, by token
+        self._budgets: Dict[str, List[float]] = {}
+
+    def board_id(self, index: int) -> int:
+        """Return the ID of the board at an index."""
+        return 1000 + index
+
+    def item_id(self, board_id: int, index: int) -> int:
+        """Return the ID of the item at an index of the board."""
+        return board_id * 10000 + index
+
+    def board(self, board_id: int, variables: dict) -> dict:
+        """Return a board, its nested objects are resolved when selected."""
+        scale = self.scale
+        return {
+            "id": str(board_id),
+            "name": f"Board {board_id}",
+            "description": "Synthetic board",
+            "state": "active",
+            "updated_at": UPDATED_AT,
+            "workspace": {"id": 1, "name": "Main", "kind": None, "description": None},
+            "owner": {"id": 1, "name": "Bat Man", "email": "batman@batman.com"},
+            "groups": lambda: [
+                self.group(index) for index in range(scale.groups_per_board)
+            ],
+            "columns": lambda: [
+                self.column(index) for index in range(scale.columns_per_board)
+            ],
+            "items": lambda: [
+                self.item(board_id, index)
+                for index in self.page(
+                    scale.items_per_board,
+                    variables.get("item_limit"),
+                    variables.get("page"),
+                )
+            ],
+            "activity_logs": lambda: [],
+        }
+
+    def group(self, index: int) -> dict:
+        """Return a group of a board."""
+        return {
+            "id": f"group_{index}",
+            "title": f"Group {index}",
+            "position": str(65536.0 * (index + 1)),
+            "color": "#037f4c",
+            "archived": False,
+            "deleted": False,
+        }
+
+    def column(self, index: int) -> dict:
+        """Return a column of a board."""
+        return {
+            "id": f"text_{index}",
+            "title": f"Column {index}",
+            "archived": False,
+            "settings_str": "{}",
+            "description": None,
+            "type": "text",
+            "width": 120,
+        }
+
+    def item(self, board_id: int, index: int) -> dict:
+        """Return an item of a board."""
+        item_id = self.item_id(board_id, index)
+        return {
+            "id": str(item_id),
+            "name": f"Item {item_id}",
+            "state": "active",
+            "created_at": UPDATED_AT,
+            "updated_at": UPDATED_AT,
+            "creator_id": "1",
+            "creator": {"email": "batman@batman.com", "name": "Bat Man"},
+            "board": {"id": str(board_id)},
+            "group": {"id": f"group_{index % max(self.scale.groups_per_board, 1)}"},
+            "parent_item": None,
+            "column_values": lambda: [
+                self.column_value(item_id, column)
+                for column in range(self.scale.columns_per_board)
+            ],
+        }
+
+    def column_value(self, item_id: int, index: int) -> dict:
+        """Return the value of a column of an item."""
+        return {
+            "id": f"text_{index}",
+            "title": f"Column {index}",
+            "text": f"Value {item_id} {index}",
+            "type": "text",
+            "value": json.dumps(f"Value {item_id} {index}"),
+            "additional_info": None,
+            "description": None,
+        }
+
+    def page(
+        self, total: int, limit: Optional[int], page: Optional[int]
+    ) -> Iterator[int]:
+        """Return the indexes on a page, all of them without a limit."""
+        if limit is None:
+            return iter(range(total))
+        start = ((page or 1) - 1) * limit
+        return iter(range(start, min(start + limit, total)))
+
+    def as_list(self, ids: Any) -> Optional[List[int]]:
+        """Return IDs of a variable holding one ID, a list or none."""
+        if ids is None:
+            return None
+        return ids if isinstance(ids, list) else [ids]
+
+    def boards(self, variables: dict) -> List[dict]:
+        """Return the boards of the boards root field."""
+        all_ids = [self.board_id(index) for index in range(self.scale.boards)]
+        board_ids = self.as_list(variables.get("board_ids"))
+        if board_ids is not None:
+            all_ids = [board_id for board_id in all_ids if board_id in board_ids]
+        indexes = self.page(
+            len(all_ids), variables.get("board_limit"), variables.get("page")
+        )
+        return [self.board(all_ids[index], variables) for index in indexes]
+
+    def items(self, variables: dict) -> List[dict]:
+        """Return the items of the items root field."""
+        items = []
+        for item_id in self.as_list(variables.get("item_ids")) or []:
+            board_id, index = divmod(item_id, 10000)
+            if 0 <= board_id - 1000 < self.scale.boards and (
+                index < self.scale.items_per_board
+            ):
+                items.append(self.item(board_id, index))
+        # Monday.com returns 25 items unless a limit is set
+        limit = variables.get("item_limit") or 25
+        return items[:limit]
+
+    def execute(self, payload: dict, token: str = "") -> Tuple[int, dict, dict]:
+        """Answer a query sent with a token, returning the status, headers and body."""
+        query = payload["query"]
+        variables = payload.get("variables") or {}
+        operation = OPERATION_RE.match(query)
+        name = operation.group(1) if operation else "anonymous"
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            self.token_requests[token] = self.token_requests.get(token, 0) + 1
+
+        if self.scale.latency:
+            time.sleep(self.scale.latency)
+
+        roots: Dict[str, Callable[[dict], Any]] = {
+            "boards": self.boards,
+            "items": self.items,
+        }
+        selection = parse_selection(query)
+        data = {
+            field: project(roots[field](variables), sub)
+            for field, sub in selection.items()
+            if field in roots
+        }
+        cost = 10 + count_objects(data)
+
+        with self._lock:
+            now = time.monotonic()
+            used = self._budgets.setdefault(token, [0, 0.0])
+            if now >= used[1]:
+                used[:] = [0, now + self.scale.budget_period]
+            reset_in = int(used[1] - now) + 1
+            budget = self.scale.complexity_budget
+            if budget and used[0] + cost > budget:
+                return self.rate_limited(cost, budget - used[0], budget, reset_in)
+            before = budget - used[0] if budget else 10000000
+            used[0] += cost
+
+        if "complexity" in selection:
+            data["complexity"] = {
+                "before": before,
+                "after": before - cost,
+                "query": cost,
+                "reset_in_x_seconds": reset_in,
+            }
+        return 200, {}, {"data": data, "account_id": 1}
+
+    def rate_limited(
+        self, cost: int, remaining: float, budget: int, reset_in: int
+    ) -> Tuple[int, dict, dict]:
+        """Answer a query that does not fit into the budget left."""
+        self.requests["rate_limited"] = self.requests.get("rate_limited", 0) + 1
+        if self.scale.rate_limit_response == "429":
+            return 429, {"Retry-After": str(reset_in)}, {"error_message": "Rate limit"}
+
+        message = (
+            f"Complexity budget exhausted, query cost {cost} budget remaining "
+            f"{remaining} out of {budget} reset in {reset_in} seconds"
+        )
+        return 200, {}, {"errors": [{"message": message}], "account_id": 1}
+
+
+class ThreadingServer(socketserver.ThreadingMixIn, HTTPServer):
+    """HTTP server answering every connection in a thread."""
+
+    daemon_threads = True
+
+
+class MockMondayServer:
+    """HTTP server of a synthetic account on a free local port.
+
+    Usable as a context manager, the API URL is in `url`. The connections
+    clients opened are counted in `connections`.
+    """
+
+    def __init__(self, scale: Optional[MockScale] = None) -> None:
+        """Initialize the server, it only listens once started."""
+        self.account = MockMonday(scale or MockScale())
+        self.connections = 0
+        account = self.account
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out separately, don't wait for acks between
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                server.connections += 1
+                super().setup()
+
+            def do_POST(self) -> None:  # noqa: N802
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                token = self.headers.get("Authorization", "")
+                status, headers, body = account.execute(payload, token)
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(content)))
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.httpd = ThreadingServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v2"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MockMondayServer":
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockMondayServer":
+        """Start serving."""
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop serving."""
+        self.stop()
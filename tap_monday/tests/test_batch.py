@@ -0,0 +1,54 @@
+"""Tests of writing records to batch files."""
+
+import gzip
+import io
+import json
+from urllib.parse import urlparse
+
+from tap_monday.batch import BatchWriter
+
+
+def read_batches(output):
+    messages = [json.loads(line) for line in output.getvalue().splitlines()]
+    records = {}
+    for message in messages:
+        assert message["encoding"] == {"format": "jsonl", "compression": "gzip"}
+        for uri in message["manifest"]:
+            with gzip.open(urlparse(uri).path, "rt") as batch_file:
+                rows = [json.loads(line) for line in batch_file]
+            records.setdefault(message["stream"], []).append(rows)
+    return records
+
+
+def test_batches_rolled_over(tmp_path):
+    output = io.StringIO()
+    writer = BatchWriter(tmp_path.as_uri(), "run-", max_rows=3, output=output)
+    for index in range(4):
+        writer.write("items", {"id": index})
+    writer.write("boards", {"id": 1})
+    assert len(output.getvalue().splitlines()) == 1
+
+    writer.close()
+    assert read_batches(output) == {
+        "items": [[{"id": 0}, {"id": 1}, {"id": 2}], [{"id": 3}]],
+        "boards": [[{"id": 1}]],
+    }
+    assert all(path.name.startswith("run-") for path in tmp_path.iterdir())
+
+
+def test_state_written_after_batches(tmp_path):
+    output = io.StringIO()
+    writer = BatchWriter(str(tmp_path), max_bytes=30, output=output)
+
+    def write_state():
+        output.write('{"type": "STATE"}\n')
+
+    writer.write_state(write_state)
+    writer.write("items", {"id": 1})
+    writer.write("boards", {"id": 1})
+    writer.write_state(write_state)
+    assert output.getvalue().count("STATE") == 1
+
+    writer.write("items", {"id": 2, "name": "An item"})
+    types = [json.loads(line)["type"] for line in output.getvalue().splitlines()]
+    assert types == ["STATE", "BATCH", "BATCH", "STATE"]
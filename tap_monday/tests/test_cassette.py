@@ -0,0 +1,55 @@
+"""Tests of recording and replaying API responses."""
+
+import json
+
+import pytest
+import requests
+
+from tap_monday.cassette import CassetteAdapter, request_key
+
+
+def test_request_key_ignores_formatting():
+    body = {"query": "query { boards { id } }", "variables": {"a": 1, "b": 2}}
+    other = {"variables": {"b": 2, "a": 1}, "query": "query { boards { id } }"}
+    assert request_key(json.dumps(body).encode()) == request_key(json.dumps(other))
+    assert request_key(json.dumps(body)) != request_key(
+        json.dumps({**body, "variables": {"a": 2, "b": 2}})
+    )
+
+
+class FakeAdapter(requests.adapters.BaseAdapter):
+    def __init__(self, bodies):
+        super().__init__()
+        self.bodies = bodies
+
+    def send(self, request, *args, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["X-Test"] = "1"
+        response._content = json.dumps(self.bodies.pop(0)).encode()
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_record_and_replay(tmp_path):
+    url = "https://api.monday.test/v2"
+    adapter = FakeAdapter(
+        [{"errors": [{"message": "Rate limited"}]}, {"data": {"boards": []}}]
+    )
+    session = requests.Session()
+    session.mount("https://", CassetteAdapter(str(tmp_path), "record", adapter))
+    payload = {"query": "query { boards { id } }", "variables": {}}
+    session.post(url, json=payload)
+    assert not list(tmp_path.iterdir())
+    session.post(url, json=payload)
+
+    replay = requests.Session()
+    replay.mount("https://", CassetteAdapter(str(tmp_path), "replay"))
+    response = replay.post(url, json=payload)
+    assert response.json() == {"data": {"boards": []}}
+    assert response.headers["x-test"] == "1"
+    with pytest.raises(FileNotFoundError):
+        replay.post(url, json={**payload, "variables": {"page": 2}})
@@ -51,3 +51,27 @@ def test_board_ids_str_list_space():
     stream = BoardsStream(tap=tap)
     board_ids = stream.board_ids()
     assert board_ids == [2580307008, 1903379862]
+
+
+def test_tapped_at_per_second(monkeypatch):
+    tap = TapMonday(config=SAMPLE_CONFIG)
+    stream = BoardsStream(tap=tap)
+    now = [1650000000.2]
+    monkeypatch.setattr("tap_monday.client.time.time", lambda: now[0])
+    assert stream.tapped_at() == "2022-04-15T05:20:00Z"
+    now[0] = 1650000000.9
+    assert stream.tapped_at() == "2022-04-15T05:20:00Z"
+    now[0] = 1650000001.0
+    assert stream.tapped_at() == "2022-04-15T05:20:01Z"
+
+
+def test_tapped_at_per_run():
+    tap = TapMonday(config={**SAMPLE_CONFIG, "tapped_at_per_run": True})
+    stream = BoardsStream(tap=tap)
+    assert stream.tapped_at() == tap.streams["groups"].tapped_at()
+    assert stream.tapped_at() == tap.run_tapped_at
+
+
+def test_fractional_read_timeout():
+    tap = TapMonday(config={**SAMPLE_CONFIG, "http_read_timeout": 0.5})
+    assert BoardsStream(tap=tap).timeout == 0.5
@@ -0,0 +1,53 @@
+"""Incremental JSON parser tests."""
+
+import json
+
+import pytest
+
+from tap_monday.json_stream import iter_json_items
+
+DOCUMENT = {
+    "data": {
+        "complexity": {"after": 900},
+        "boards": [
+            {"id": "1", "items": [{"id": "11", "name": "Ünïcode"}, {"id": 12.5}]},
+            {"id": "2", "items": None},
+            {"id": "3", "columns": [{"id": "x"}], "items": []},
+            {"id": "4", "items": [{"id": "41", "text": "x" * 100000}]},
+        ],
+    },
+    "account_id": 123,
+}
+
+
+def chunked(document, size):
+    body = json.dumps(document, ensure_ascii=False, indent=1).encode()
+    starts = range(0, len(body), size)
+    return [body[start:end] for start, end in zip(starts, [*starts[1:], None])]
+
+
+@pytest.mark.parametrize("size", [1, 7, 1024, 10**6])
+def test_iter_json_items(size):
+    root = {}
+    items = [
+        (parents[-1]["id"], item)
+        for parents, item in iter_json_items(
+            chunked(DOCUMENT, size), ["data", "boards", "items"], root
+        )
+    ]
+
+    assert items == [
+        ("1", {"id": "11", "name": "Ünïcode"}),
+        ("1", {"id": 12.5}),
+        ("4", {"id": "41", "text": "x" * 100000}),
+    ]
+    assert root == {"data": {"complexity": {"after": 900}}, "account_id": 123}
+
+
+def test_iter_json_items_missing_path():
+    assert list(iter_json_items(chunked({"errors": [{}]}, 3), ["data", "boards"])) == []
+
+
+def test_iter_json_items_truncated():
+    with pytest.raises(ValueError):
+        list(iter_json_items(chunked(DOCUMENT, 50)[:-3], ["data", "boards", "items"]))
@@ -0,0 +1,27 @@
+"""Memory budget tests."""
+
+from tap_monday.memory import MemoryBudget, current_rss_mb
+
+
+def test_exceeded_by_records_held():
+    budget = MemoryBudget(max_records=10)
+    budget.hold(10)
+    assert not budget.exceeded()
+    budget.hold(1)
+    assert budget.exceeded()
+    budget.release(5)
+    assert not budget.exceeded()
+
+
+def test_exceeded_by_resident_memory():
+    rss_mb = [100.0]
+    budget = MemoryBudget(max_records=10, max_rss_mb=200, rss_mb=lambda: rss_mb[0])
+    assert not budget.exceeded()
+    rss_mb[0] = 250.0
+    assert budget.exceeded()
+
+
+def test_unknown_resident_memory_not_exceeded():
+    budget = MemoryBudget(max_records=10, max_rss_mb=1, rss_mb=lambda: None)
+    assert not budget.exceeded()
+    assert current_rss_mb() is None or current_rss_mb() > 0
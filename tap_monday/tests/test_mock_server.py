@@ -0,0 +1,441 @@
+"""Tests of the tap against the local mock server."""
+
+import gzip
+import json
+from dataclasses import replace
+from urllib.parse import urlparse
+
+import pytest
+
+from tap_monday.tap import TapMonday
+from tap_monday.tests.mock_server import MockMondayServer, MockScale
+
+SCALE = MockScale(boards=3, groups_per_board=2, columns_per_board=3, items_per_board=4)
+
+
+def sync(config):
+    tap = TapMonday(config=config)
+    counts = {name: 0 for name in tap.streams}
+
+    def counter(name):
+        def count(record):
+            counts[name] += 1
+
+        return count
+
+    for name, stream in tap.streams.items():
+        stream._write_record_message = counter(name)
+    tap.sync_all()
+    return counts
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {},
+        {"board_batch_size": 2, "batch_column_values": True, "stream_responses": True},
+        {"combined_board_fetch": True, "max_workers": 3},
+        {"paginate_items": True, "item_limit": 3, "complexity_rate_limit": True},
+    ],
+)
+def test_sync_mock_server(settings):
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "board_limit": 2,
+            "column_value_limit": 3,
+            **settings,
+        }
+        counts = sync(config)
+
+    assert counts == {
+        "boards": 3,
+        "groups": 6,
+        "items": 12,
+        "columns": 9,
+        "column_values": 36,
+    }
+
+
+def test_metrics_file(tmp_path):
+    metrics_path = tmp_path / "metrics.json"
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "board_limit": 2,
+            "complexity_rate_limit": True,
+            "metrics_path": str(metrics_path),
+        }
+        sync(config)
+
+    streams = json.loads(metrics_path.read_text())["streams"]
+    assert {stream: totals["requests"] for stream, totals in streams.items()} == {
+        "boards": 2,
+        "columns": 3,
+        "groups": 3,
+        "items": 3,
+        "column_values": 12,
+    }
+    assert streams["column_values"]["records"] == 36
+    assert streams["items"]["response_bytes"] > 0
+    assert streams["items"]["complexity"] > 0
+    assert streams["items"]["latency_seconds"]["max"] > 0
+
+
+def test_column_cache(tmp_path):
+    cache_path = tmp_path / "columns.json"
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "column_cache_path": str(cache_path),
+        }
+        tap = TapMonday(config=config)
+        values = []
+        tap.streams["column_values"]._write_record_message = values.append
+        tap.sync_all()
+        first_run = dict(server.account.requests)
+
+        assert sync(config)["columns"] == 9
+        second_run = {
+            query: count - first_run.get(query, 0)
+            for query, count in server.account.requests.items()
+        }
+
+    assert len(json.loads(cache_path.read_text())["boards"]) == 3
+    assert first_run["Columns"] == 3
+    assert "ColumnDefinitions" not in first_run
+    assert second_run["Columns"] == 0
+    assert values[0]["title"] == "Column 0"
+    assert values[0]["type"] == "text"
+
+
+def test_change_detection(tmp_path):
+    with MockMondayServer(replace(SCALE)) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "change_detection_path": str(tmp_path / "hashes.json"),
+            "emit_tombstones": True,
+        }
+        first_run = sync(config)
+        second_run = sync(config)
+        server.account.scale.columns_per_board = 2
+        third_run = sync(config)
+
+    assert first_run["column_values"] == 36
+    assert second_run == {
+        "boards": 3,
+        "groups": 0,
+        "items": 12,
+        "columns": 0,
+        "column_values": 0,
+    }
+    # Tombstones of the last column of each board and its values
+    assert third_run["columns"] == 3
+    assert third_run["column_values"] == 12
+    assert third_run["groups"] == 0
+
+
+def test_adaptive_board_limit():
+    with MockMondayServer(replace(SCALE, boards=40)) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "board_limit": 2,
+            "adaptive_board_limit": True,
+            "max_board_limit": 16,
+        }
+        tap = TapMonday(config=config)
+        stream = tap.streams["boards"]
+        board_ids = [int(board["id"]) for board in stream.get_records(None)]
+        requests = server.account.requests["Boards"]
+
+    assert board_ids == list(range(1000, 1040))
+    # Pages of 2, 2, 4, 8 and 16 boards as offsets allow, then the last 8
+    assert requests == 6
+
+
+def test_connections_reused():
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "max_workers": 3,
+            "http_pool_size": 4,
+            "tcp_keepalive_seconds": 30,
+        }
+        sync(config)
+        requests = sum(server.account.requests.values())
+
+    assert requests > 20
+    # All sessions share the pool, the main thread and each worker thread
+    # send one request at a time
+    assert server.connections <= 4
+
+
+def test_auth_tokens():
+    scale = replace(SCALE, complexity_budget=400, rate_limit_response="429")
+    with MockMondayServer(scale) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "a",
+            "auth_tokens": ["b", "c"],
+            "complexity_rate_limit": True,
+        }
+        counts = sync(config)
+        token_requests = server.account.token_requests
+
+    assert counts["column_values"] == 36
+    # Every token gets a share of the requests before its budget is spent
+    assert set(token_requests) == {"a", "b", "c"}
+    assert min(token_requests.values()) >= sum(token_requests.values()) / 6
+    assert "rate_limited" not in server.account.requests
+
+
+def test_incremental_items_with_column_values(select_streams):
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "incremental_items": True,
+        }
+        catalog = select_streams(config, ("boards", "items", "column_values"))
+        tap = TapMonday(config=config, catalog=catalog)
+        tap.sync_all()
+        first_run = dict(server.account.requests)
+
+        tap = TapMonday(config=config, catalog=catalog, state=tap.state)
+        values = []
+        tap.streams["column_values"]._write_record_message = values.append
+        tap.sync_all()
+        second_run = {
+            query: count - first_run.get(query, 0)
+            for query, count in server.account.requests.items()
+            if count > first_run.get(query, 0)
+        }
+
+    assert first_run["Items"] == 3
+    assert first_run["ColumnValues"] == 12
+    # Nothing changed since, so neither items nor their values are requested
+    assert second_run == {"Boards": 1, "ItemActivity": 3}
+    assert values == []
+
+
+def test_interrupted_child_batch_resumed(capsys, select_streams):
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "board_ids": [1000],
+            "incremental_items": True,
+            "batch_column_values": True,
+            "column_value_limit": 10,
+        }
+        catalog = select_streams(config, ("boards", "items", "column_values"))
+        tap = TapMonday(config=config, catalog=catalog)
+
+        def interrupt(context):
+            raise RuntimeError("Interrupted")
+
+        # The items of the board fit in one batch, synced once they are all read
+        tap.streams["column_values"].fetch_records = interrupt
+        with pytest.raises(RuntimeError):
+            tap.sync_all()
+        states = [
+            json.loads(line)["value"]
+            for line in capsys.readouterr().out.splitlines()
+            if line.startswith('{"type": "STATE"')
+        ]
+
+        tap = TapMonday(config=config, catalog=catalog, state=states[-1])
+        values = []
+        tap.streams["column_values"]._write_record_message = values.append
+        tap.sync_all()
+
+    assert len(values) == 12
+
+
+def test_item_wide_stream():
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "item_wide_stream": True,
+            "batch_column_values": True,
+        }
+        tap = TapMonday(config=config)
+        rows = []
+        tap.streams["item_wide"]._write_record_message = rows.append
+        tap.sync_all()
+
+    properties = tap.streams["item_wide"].schema["properties"]
+    assert "text_2" in properties and "text_2_value" in properties
+    assert len(rows) == 12
+    assert rows[0]["item_id"] == 10000000
+    assert rows[0]["board_id"] == 1000
+    assert rows[0]["text_1"] == "Value 10000000 1"
+    assert json.loads(json.loads(rows[0]["text_1_value"])) == "Value 10000000 1"
+
+
+def test_item_wide_columns_from_catalog():
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "item_wide_stream": True,
+        }
+        catalog = TapMonday(config=config).catalog_dict
+        discovered = dict(server.account.requests)
+        tap = TapMonday(config=config, catalog=catalog)
+        properties = tap.streams["item_wide"].schema["properties"]
+
+        assert discovered == {"ItemWideColumns": 1}
+        assert server.account.requests == discovered
+    assert "text_2" in properties and "text_2_value" in properties
+
+
+def test_item_wide_columns_cached_and_sharded(tmp_path):
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "item_wide_stream": True,
+            "column_cache_path": str(tmp_path / "columns.json"),
+        }
+        first = TapMonday(config=config).streams["item_wide"].schema
+        first_run = dict(server.account.requests)
+        second = TapMonday(config=config).streams["item_wide"].schema
+        second_run = dict(server.account.requests)
+        TapMonday(
+            config={
+                **config,
+                "board_ids": [1000],
+                "shard_index": 1,
+                "shard_processes": 2,
+            }
+        ).streams["item_wide"].schema
+
+        assert first_run == {"ItemWideColumns": 1, "ItemWideColumnDefinitions": 1}
+        assert second_run == {"ItemWideColumns": 2, "ItemWideColumnDefinitions": 1}
+        assert server.account.requests == second_run
+    assert first == second
+
+
+def test_fast_serialization(capsys):
+    outputs = []
+    for fast_serialization in (False, True):
+        with MockMondayServer(SCALE) as server:
+            config = {
+                "api_url": server.url,
+                "auth_token": "token",
+                "fast_serialization": fast_serialization,
+            }
+            TapMonday(config=config).sync_all()
+
+        messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        for message in messages:
+            message.pop("time_extracted", None)
+            message.get("record", {}).pop("tapped_at", None)
+        outputs.append(messages)
+
+    assert outputs[1] == outputs[0]
+    assert len([m for m in outputs[1] if m["type"] == "RECORD"]) == 66
+
+
+def test_batch_messages(tmp_path, capsys):
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "batch_root": tmp_path.as_uri(),
+            "batch_max_rows": 20,
+        }
+        TapMonday(config=config).sync_all()
+
+    messages = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert not [m for m in messages if m["type"] == "RECORD"]
+    assert messages[-1]["type"] == "STATE"
+
+    counts: dict = {}
+    for message in messages:
+        if message["type"] == "BATCH":
+            for uri in message["manifest"]:
+                with gzip.open(urlparse(uri).path, "rt") as batch_file:
+                    rows = sum(1 for _ in batch_file)
+                stream = message["stream"]
+                counts[stream] = counts.get(stream, 0) + rows
+    assert counts == {
+        "boards": 3,
+        "groups": 6,
+        "items": 12,
+        "columns": 9,
+        "column_values": 36,
+    }
+
+
+def test_bounded_memory(capsys):
+    with MockMondayServer(SCALE) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "bounded_memory": True,
+            "max_buffered_records": 2,
+            "max_workers": 3,
+        }
+        counts = sync(config)
+
+    assert counts == {
+        "boards": 3,
+        "groups": 6,
+        "items": 12,
+        "columns": 9,
+        "column_values": 36,
+    }
+    states = [
+        json.loads(line)["value"]
+        for line in capsys.readouterr().out.splitlines()
+        if line.startswith('{"type": "STATE"')
+    ]
+    for stream in ("groups", "columns", "column_values"):
+        assert not states[-1]["bookmarks"][stream].get("partitions")
+
+
+def test_cassette_replay(tmp_path):
+    config = {
+        "auth_token": "token",
+        "cassette_path": str(tmp_path),
+        "batch_column_values": True,
+    }
+    with MockMondayServer(SCALE) as server:
+        recorded = sync({**config, "api_url": server.url, "cassette_mode": "record"})
+
+    # The server is gone, the responses come from the recording
+    for settings in ({}, {"stream_responses": True}, {"bounded_memory": True}):
+        replayed = sync({**config, "api_url": server.url, **settings})
+        assert replayed == recorded
+        assert replayed["column_values"] == 36
+
+
+def test_cassette_replay_not_rate_limited(tmp_path, monkeypatch):
+    config = {
+        "auth_token": "token",
+        "cassette_path": str(tmp_path),
+        "complexity_rate_limit": True,
+    }
+    # The recorded run spends most of the budget, and waits for it to reset
+    scale = replace(SCALE, complexity_budget=100, budget_period=0.2)
+    with MockMondayServer(scale) as server:
+        recorded = sync({**config, "api_url": server.url, "cassette_mode": "record"})
+
+    tap = TapMonday(config={**config, "api_url": server.url})
+    sleeps = []
+    monkeypatch.setattr(tap.rate_limiter, "_sleep", sleeps.append)
+    records = []
+    tap.streams["column_values"]._write_record_message = records.append
+    tap.sync_all()
+
+    assert len(records) == recorded["column_values"]
+    assert sleeps == []
@@ -0,0 +1,45 @@
+"""Adaptive page size tests."""
+
+from tap_monday.page_size import AdaptivePageSize
+
+
+def page_size(initial=4):
+    return AdaptivePageSize(
+        initial, minimum=2, maximum=20, target_seconds=10, target_complexity=1000
+    )
+
+
+def test_sizes_within_limits():
+    assert page_size(initial=3).size == 2
+    assert page_size(initial=100).size == 16
+    assert page_size(initial=1).size == 2
+
+
+def test_grows_under_target_and_shrinks_over_it():
+    size = page_size()
+    size.observe(1.0, 100)
+    assert size.size == 8
+    size.observe(6.0, 100)  # A page twice as large would take too long
+    assert size.size == 8
+    size.observe(1.0, 1500)
+    assert size.size == 4
+    size.observe(1.0, None)
+    size.observe(1.0, None)
+    size.observe(1.0, None)
+    assert size.size == 16
+
+
+def test_shrink_stops_at_minimum():
+    size = page_size()
+    for _ in range(3):
+        size.shrink()
+    assert size.size == 2
+
+
+def test_limit_at_fits_offset():
+    size = page_size(initial=16)
+    assert size.limit_at(0) == 16
+    assert size.limit_at(32) == 16
+    assert size.limit_at(8) == 8
+    assert size.limit_at(6) == 2
+    assert size.limit_at(5) == 1
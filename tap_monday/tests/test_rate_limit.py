@@ -0,0 +1,107 @@
+"""Rate limiter tests."""
+
+import pytest
+
+from tap_monday.rate_limit import ComplexityRateLimiter, TokenPool, retry_after_seconds
+
+
+class FakeClock:
+    """Clock that only moves when the limiter sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def complexity(after, query=100, reset_in=30):
+    return {
+        "before": after + query,
+        "after": after,
+        "query": query,
+        "reset_in_x_seconds": reset_in,
+    }
+
+
+def test_wait_without_budget_info():
+    clock = FakeClock()
+    limiter = ComplexityRateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.wait("boards")
+    assert clock.sleeps == []
+
+
+def test_wait_while_budget_fits():
+    clock = FakeClock()
+    limiter = ComplexityRateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.update("boards", complexity(after=250))
+    limiter.wait("boards")
+    limiter.wait("boards")
+    assert clock.sleeps == []
+
+
+def test_wait_for_reset_when_budget_is_spent():
+    clock = FakeClock()
+    limiter = ComplexityRateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.update("boards", complexity(after=150))
+    limiter.wait("boards")
+    limiter.wait("boards")
+    assert clock.sleeps == [30]
+
+
+def test_block_for_retry_after():
+    clock = FakeClock()
+    limiter = ComplexityRateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.block_for(12)
+    assert limiter.seconds_blocked() == 12
+    limiter.wait("items")
+    assert clock.sleeps == [12]
+    assert limiter.seconds_blocked() == 0
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [
+        ("15", 15),
+        ("Wed, 21 Oct 2015 07:28:15 GMT", 15),
+        ("Wed, 21 Oct 2015 07:27:00 GMT", 0),
+        ("soon", None),
+        (None, None),
+    ],
+)
+def test_retry_after_seconds(value, seconds):
+    # Wed, 21 Oct 2015 07:28:00 GMT
+    assert retry_after_seconds(value, now=lambda: 1445412480.0) == seconds
+
+
+def test_block_until_reset():
+    clock = FakeClock()
+    limiter = ComplexityRateLimiter(clock=clock.time, sleep=clock.sleep)
+    limiter.update("items", complexity(after=0, reset_in=20))
+    limiter.block_for()
+    assert limiter.seconds_blocked() == 20
+
+
+def test_tokens_take_turns():
+    pool = TokenPool(["a", "b", "c", "a"])
+    assert [pool.acquire() for _ in range(4)] == ["a", "b", "c", "a"]
+
+
+def test_throttled_token_skipped():
+    clock = FakeClock()
+    pool = TokenPool(["a", "b"], clock=clock.time, sleep=clock.sleep)
+    pool.limiter("a").block_for(10)
+    assert [pool.acquire() for _ in range(3)] == ["b", "b", "b"]
+    assert pool.seconds_blocked() == 0
+
+    pool.limiter("b").block_for(5)
+    assert pool.acquire() == "b"
+    assert pool.seconds_blocked() == 5
+
+    clock.now = 10
+    assert [pool.acquire() for _ in range(2)] == ["a", "b"]
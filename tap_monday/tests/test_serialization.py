@@ -0,0 +1,54 @@
+"""Tests of the fast writing of RECORD messages."""
+
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import singer
+
+from tap_monday.serialization import RecordWriter, dumps_value, format_time
+
+
+def test_record_messages_match_singer():
+    messages = [
+        singer.RecordMessage(
+            stream="column_values",
+            record={"id": "status", "text": "Done ✓", "value": '{"index": 1}'},
+            time_extracted=datetime(2022, 3, 4, 5, 6, 7, 89, tzinfo=timezone.utc),
+        ),
+        singer.RecordMessage(stream="boards", record={"id": 1, "score": 0.1}),
+        singer.RecordMessage(stream="boards", record={"id": 2}, version=3),
+        singer.RecordMessage(stream="boards", record={"amount": Decimal("1.10")}),
+    ]
+    output = io.StringIO()
+    writer = RecordWriter(output)
+    for message in messages:
+        writer.write(message)
+    assert output.getvalue() == ""
+
+    writer.write_message(singer.StateMessage(value={"bookmarks": {}}))
+    assert output.getvalue() == "".join(
+        singer.format_message(message) + "\n" for message in messages
+    )
+
+
+def test_buffer_written_out_when_full():
+    output = io.StringIO()
+    writer = RecordWriter(output, buffer_size=100)
+    message = singer.RecordMessage(stream="boards", record={"id": 1})
+    writer.write(message)
+    assert output.getvalue() == ""
+
+    writer.write(message)
+    assert output.getvalue().count("\n") == 2
+
+
+def test_dumps_value():
+    for value in ['{"text": "é"}', None, {"a": [1, 2]}, 1.5]:
+        assert dumps_value(value) == json.dumps(value)
+
+
+def test_format_time():
+    value = datetime(2022, 3, 4, 5, 6, 7, tzinfo=timezone(timedelta(hours=2)))
+    assert format_time(value) == singer.utils.strftime(value.astimezone(timezone.utc))
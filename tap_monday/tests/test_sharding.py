@@ -0,0 +1,125 @@
+"""Sharded run tests."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from tap_monday.tap import TapMonday
+from tap_monday.sharding import TAP_CLI, merge_state, shard_config
+from tap_monday.tests.mock_server import MockMondayServer, MockScale
+
+
+def test_merge_state():
+    state = {
+        "bookmarks": {
+            "groups": {"partitions": [{"context": {"board_id": 1000}}]},
+            "boards": {
+                "child_bookmarks": {"groups": {"1000": "2022-01-01T00:00:00Z"}},
+                "checkpoint_shard_0_of_2": {"page": 2, "completed_boards": [1000]},
+            },
+        }
+    }
+    other = {
+        "bookmarks": {
+            "groups": {
+                "partitions": [
+                    {"context": {"board_id": 1000}},
+                    {"context": {"board_id": 1001}},
+                ]
+            },
+            "boards": {
+                "child_bookmarks": {"groups": {"1001": "2022-01-02T00:00:00Z"}},
+                "replication_key_value": "2022-01-02T00:00:00Z",
+            },
+        }
+    }
+
+    assert merge_state(state, other) == {
+        "bookmarks": {
+            "groups": {
+                "partitions": [
+                    {"context": {"board_id": 1000}},
+                    {"context": {"board_id": 1001}},
+                ]
+            },
+            "boards": {
+                "child_bookmarks": {
+                    "groups": {
+                        "1000": "2022-01-01T00:00:00Z",
+                        "1001": "2022-01-02T00:00:00Z",
+                    }
+                },
+                "checkpoint_shard_0_of_2": {"page": 2, "completed_boards": [1000]},
+                "replication_key_value": "2022-01-02T00:00:00Z",
+            },
+        }
+    }
+
+
+def test_shard_config():
+    config = {"auth_token": "token", "metrics_path": "metrics.json"}
+
+    assert shard_config(config, 1) == {
+        "auth_token": "token",
+        "metrics_path": "metrics.json.shard1",
+        "shard_index": 1,
+    }
+
+
+def test_shard_without_boards(requests_mock):
+    config = {
+        "api_url": "mock://api.monday.test/v2",
+        "auth_token": "token",
+        "board_ids": "3, 5",
+        "shard_processes": 2,
+    }
+    records = []
+    stream = TapMonday(config={**config, "shard_index": 0}).streams["boards"]
+    stream._write_record_message = records.append
+    stream.sync()
+
+    assert stream.board_ids() == []
+    assert not records
+    assert not requests_mock.request_history
+    assert TapMonday(config=config).streams["boards"].shard_processes == 2
+    single = {**config, "board_ids": "3", "shard_processes": 4}
+    assert TapMonday(config=single).streams["boards"].shard_processes == 1
+
+
+def test_sharded_sync(tmp_path):
+    scale = MockScale(boards=5, groups_per_board=2, columns_per_board=2)
+    with MockMondayServer(scale) as server:
+        config = {
+            "api_url": server.url,
+            "auth_token": "token",
+            "board_limit": 2,
+            "shard_processes": 3,
+            "skip_unchanged_boards": True,
+        }
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(config))
+        output = subprocess.run(
+            [sys.executable, "-c", TAP_CLI, "--config", str(config_path)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parents[2],
+        ).stdout
+
+    messages = [json.loads(line) for line in output.splitlines()]
+    records: dict = {}
+    for message in messages:
+        if message["type"] == "RECORD":
+            records.setdefault(message["stream"], []).append(message["record"])
+    schemas = [message["stream"] for message in messages if message["type"] == "SCHEMA"]
+    state = [message for message in messages if message["type"] == "STATE"][-1]
+
+    assert sorted(board["id"] for board in records["boards"]) == list(range(1000, 1005))
+    assert len(records["groups"]) == 10
+    assert len(records["column_values"]) == 5 * 20 * 2
+    assert sorted(schemas) == sorted(set(schemas))
+    bookmarks = state["value"]["bookmarks"]
+    assert len(bookmarks["groups"]["partitions"]) == 5
+    assert len(bookmarks["boards"]["child_bookmarks"]["groups"]) == 5
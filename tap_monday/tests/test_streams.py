@@ -1,7 +1,12 @@
 """Streams tests."""
 
+import json
+
+import pytest
+from singer_sdk.exceptions import FatalAPIError
 from singer_sdk.testing import get_standard_tap_tests
 
+from tap_monday.memory import MemoryBudget
 from tap_monday.tap import TapMonday
 from tap_monday.streams import (
     BoardsStream,
@@ -195,3 +200,556 @@ def test_column_values_parsing_empty_values(fixture_column_values_some_empty):
     assert processed_row["text"] == "Done"
     assert processed_row["value"] == ""
     assert processed_row["additional_info"] == ""
+
+
+def test_column_values_batch(requests_mock, fixture_items, fixture_column_values_batch):
+    config = {**SAMPLE_CONFIG, "batch_column_values": True, "column_value_limit": 2}
+    items = fixture_items["data"]["boards"][0]["items"]
+    items.append({**items[0], "id": 2274512429})
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_items, "status_code": 200},
+            {"json": fixture_column_values_batch, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config=config)
+    column_values = tap.streams["column_values"]
+    records = []
+    column_values._write_record_message = records.append
+    tap.streams["items"].sync(context={"board_id": 2389168662})
+
+    assert requests_mock.call_count == 2
+    variables = requests_mock.request_history[1].json()["variables"]
+    assert variables == {"item_ids": [2274512428, 2274512429], "item_limit": 2}
+    assert [(r["item_id"], r["text"]) for r in records] == [
+        (2274512428, "Done"),
+        (2274512429, "Working on it"),
+    ]
+
+
+def test_items_pagination(requests_mock, fixture_items):
+    config = {**SAMPLE_CONFIG, "paginate_items": True, "item_limit": 1}
+    last_page = {"data": {"boards": [{"id": "2389168662", "items": []}]}}
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_items, "status_code": 200},
+            {"json": last_page, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config=config)
+    stream = ItemsStream(tap=tap)
+    records = list(stream.get_records({"board_id": 2389168662}))
+
+    assert len(records) == 1
+    assert [r.json()["variables"]["page"] for r in requests_mock.request_history] == [
+        1,
+        2,
+    ]
+    assert requests_mock.request_history[0].json()["variables"]["item_limit"] == 1
+
+
+def test_combined_board_fetch(
+    requests_mock,
+    fixture_boards,
+    fixture_groups,
+    fixture_columns,
+    fixture_items,
+    fixture_column_values,
+):
+    config = {**SAMPLE_CONFIG, "combined_board_fetch": True}
+    board = fixture_boards["data"]["boards"][0]
+    board["groups"] = fixture_groups["data"]["boards"][0]["groups"]
+    board["columns"] = fixture_columns["data"]["boards"][0]["columns"]
+    board["items"] = fixture_items["data"]["boards"][0]["items"]
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_boards, "status_code": 200},
+            {"json": fixture_column_values, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config=config)
+    records: dict = {}
+    for name, stream in tap.streams.items():
+        stream._write_record_message = records.setdefault(name, []).append
+    tap.streams["boards"].sync()
+
+    assert "columns {" in requests_mock.request_history[0].json()["query"]
+    assert "items(ids:" in requests_mock.request_history[1].json()["query"]
+    assert requests_mock.call_count == 2
+    assert "groups" not in records["boards"][0]
+    assert records["groups"][0]["board_id"] == 2389168662
+    assert records["columns"][0]["id"] == "check"
+    assert records["items"][0]["group_id"] == "new_group8875"
+    assert records["column_values"][0]["item_id"] == 2274512428
+
+
+def test_board_batch(requests_mock, fixture_boards, fixture_groups, select_streams):
+    boards = fixture_boards["data"]["boards"]
+    boards.append({**boards[0], "id": "2389168663"})
+    groups_boards = fixture_groups["data"]["boards"]
+    groups_boards.append({**groups_boards[0], "id": "2389168663"})
+    config = {**SAMPLE_CONFIG, "board_batch_size": 2}
+    catalog = select_streams(config, ("boards", "groups"))
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_boards, "status_code": 200},
+            {"json": fixture_groups, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config=config, catalog=catalog)
+    records = []
+    tap.streams["groups"]._write_record_message = records.append
+    tap.streams["boards"].sync()
+
+    assert requests_mock.call_count == 2
+    variables = requests_mock.request_history[1].json()["variables"]
+    assert variables == {"board_ids": [2389168662, 2389168663], "board_limit": 2}
+    assert [r["board_id"] for r in records] == [2389168662, 2389168663]
+
+
+def test_max_workers(requests_mock, fixture_boards, fixture_groups, select_streams):
+    boards = fixture_boards["data"]["boards"]
+    boards += [{**boards[0], "id": str(board_id)} for board_id in range(1, 5)]
+
+    def respond(request, context):
+        variables = request.json()["variables"]
+        if "board_limit" in variables:
+            return fixture_boards
+        board = {**fixture_groups["data"]["boards"][0], "id": variables["board_ids"]}
+        return {"data": {"boards": [board]}}
+
+    config = {**SAMPLE_CONFIG, "max_workers": 3}
+    catalog = select_streams(config, ("boards", "groups"))
+    requests_mock.register_uri("POST", SAMPLE_CONFIG["api_url"], json=respond)
+    tap = TapMonday(config=config, catalog=catalog)
+    records = []
+    tap.streams["groups"]._write_record_message = records.append
+    tap.streams["boards"].sync()
+
+    assert requests_mock.call_count == 6
+    assert [r["board_id"] for r in records] == [2389168662, 1, 2, 3, 4]
+
+
+def test_bounded_memory_pauses_prefetch(
+    requests_mock, monkeypatch, fixture_boards, fixture_groups
+):
+    boards = fixture_boards["data"]["boards"]
+    boards += [{**boards[0], "id": str(board_id)} for board_id in range(1, 5)]
+
+    def respond(request, context):
+        variables = request.json()["variables"]
+        if "board_limit" in variables:
+            return fixture_boards
+        board = {**fixture_groups["data"]["boards"][0], "id": variables["board_ids"]}
+        return {"data": {"boards": [board]}}
+
+    config = {**SAMPLE_CONFIG, "max_workers": 3, "bounded_memory": True}
+    requests_mock.register_uri("POST", SAMPLE_CONFIG["api_url"], json=respond)
+    tap = TapMonday(config=config)
+    tap._memory_budget = MemoryBudget(100, max_rss_mb=1, rss_mb=lambda: 2)
+    prefetched = []
+    monkeypatch.setattr(
+        GroupsStream, "prefetch_records", lambda self, ctx: prefetched.append(ctx)
+    )
+    records = []
+    tap.streams["groups"]._write_record_message = records.append
+    tap.streams["boards"].sync()
+
+    assert not prefetched
+    assert [r["board_id"] for r in records] == [2389168662, 1, 2, 3, 4]
+    assert not tap.streams["groups"].stream_state["partitions"]
+
+
+def test_bounded_memory_prefetch_stops_at_budget(monkeypatch):
+    config = {**SAMPLE_CONFIG, "max_workers": 2, "bounded_memory": True}
+    tap = TapMonday(config=config)
+    tap._memory_budget = MemoryBudget(2)
+    stream = tap.streams["groups"]
+    fetched = []
+
+    def fetch_records(context):
+        for index in range(5):
+            fetched.append(index)
+            yield {"id": index}
+
+    monkeypatch.setattr(stream, "fetch_records", fetch_records)
+    stream.prefetch_records({"board_id": 1})
+    stream.prefetch_records({"board_id": 2})
+    stream._prefetched_records[json.dumps({"board_id": 1})].result()
+    stream._prefetched_records[json.dumps({"board_id": 2})].result()
+
+    # Fetching stops once more than the budget is held
+    assert tap.memory_budget.held <= 4
+    assert len(fetched) <= 4
+    records = list(stream.request_records({"board_id": 1}))
+    assert [record["id"] for record in records] == [0, 1, 2, 3, 4]
+    # The records of a context that isn't synced no longer count
+    stream.discard_fetched_ahead()
+    assert tap.memory_budget.held == 0
+
+    combined = TapMonday(config={**config, "combined_board_fetch": True})
+    assert not combined.streams["boards"].combined_child_streams
+
+
+def test_complexity_rate_limit(requests_mock, monkeypatch, fixture_boards):
+    sleeps = []
+    monkeypatch.setattr("backoff._sync.time.sleep", sleeps.append)
+    fixture_boards["data"]["complexity"] = {
+        "before": 10000000,
+        "after": 9999000,
+        "query": 1000,
+        "reset_in_x_seconds": 60,
+    }
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"status_code": 429, "headers": {"Retry-After": "15"}},
+            {"json": fixture_boards, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config={**SAMPLE_CONFIG, "complexity_rate_limit": True})
+    monkeypatch.setattr(tap.rate_limiter, "_sleep", sleeps.append)
+    stream = BoardsStream(tap=tap)
+    records = list(stream.get_records(None))
+
+    assert len(records) == 1
+    assert "complexity {" in requests_mock.request_history[0].json()["query"]
+    assert 14 < sleeps[0] <= 15
+
+
+def test_auth_tokens_rate_limited(requests_mock, monkeypatch, fixture_boards):
+    sleeps = []
+    monkeypatch.setattr("backoff._sync.time.sleep", sleeps.append)
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"status_code": 429, "headers": {"Retry-After": "60"}},
+            {"json": fixture_boards, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config={**SAMPLE_CONFIG, "auth_tokens": ["other"]})
+    records = list(BoardsStream(tap=tap).get_records(None))
+
+    assert len(records) == 1
+    # Without complexity_rate_limit too, the throttled token is skipped
+    assert requests_mock.request_history[-1].headers["Authorization"] == "other"
+    assert tap.token_pool.limiter("mytoken").seconds_blocked() > 50
+    assert tap.token_pool.acquire() == "other"
+    assert sleeps == [0]
+
+
+def test_deselected_fields_not_queried(fixture_items):
+    catalog = TapMonday(config=SAMPLE_CONFIG).catalog_dict
+    for entry in catalog["streams"]:
+        for metadata in entry["metadata"]:
+            if entry["tap_stream_id"] == "items" and metadata["breadcrumb"] in (
+                ["properties", "creator_email"],
+                ["properties", "creator_name"],
+                ["properties", "parent_item_id"],
+            ):
+                metadata["metadata"]["selected"] = False
+    tap = TapMonday(config=SAMPLE_CONFIG, catalog=catalog)
+    stream = tap.streams["items"]
+
+    assert "creator_id" in stream.query
+    assert "creator {" not in stream.query
+    assert "parent_item" not in stream.query
+    assert "group { id }" in stream.query
+
+    row = fixture_items["data"]["boards"][0]["items"][0]
+    del row["creator"], row["parent_item"]
+    processed_row = stream.post_process(row, {"board_id": 2389168662})
+    assert processed_row["creator_id"] == 21226602
+    assert processed_row["group_id"] == "new_group8875"
+    assert "creator_email" not in processed_row
+
+
+def test_stream_responses(requests_mock, fixture_items, fixture_column_values_batch):
+    last_page = {"data": {"boards": [{"id": "2389168662", "items": []}]}}
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_items, "status_code": 200},
+            {"json": last_page, "status_code": 200},
+            {"json": fixture_column_values_batch, "status_code": 200},
+        ]
+        * 2,
+    )
+
+    records = {}
+    for stream_responses in (False, True):
+        config = {
+            **SAMPLE_CONFIG,
+            "paginate_items": True,
+            "item_limit": 1,
+            "stream_responses": stream_responses,
+        }
+        tap = TapMonday(config=config)
+        items = list(ItemsStream(tap=tap).get_records({"board_id": 2389168662}))
+        column_values = list(
+            ColumnValuesStream(tap=tap).get_records(
+                {"item_ids": [2274512428, 2274512429]}
+            )
+        )
+        for record in items + column_values:
+            record.pop("tapped_at")
+        records[stream_responses] = (items, column_values)
+
+    assert records[True] == records[False]
+    assert len(records[True][0]) == 1
+    assert {r["item_id"] for r in records[True][1]} == {2274512428, 2274512429}
+    assert len(requests_mock.request_history) == 6
+
+
+@pytest.mark.parametrize("stream_responses", [False, True])
+def test_error_body_raises(requests_mock, stream_responses):
+    body = {"errors": [{"message": "Internal error"}], "account_id": 1}
+    requests_mock.register_uri("POST", SAMPLE_CONFIG["api_url"], json=body)
+    config = {**SAMPLE_CONFIG, "stream_responses": stream_responses}
+    stream = GroupsStream(tap=TapMonday(config=config))
+
+    with pytest.raises(FatalAPIError, match="Internal error"):
+        list(stream.get_records({"board_id": 2389168662}))
+
+
+@pytest.mark.parametrize("stream_responses", [False, True])
+def test_exhausted_budget_body_retried(requests_mock, monkeypatch, stream_responses):
+    monkeypatch.setattr("backoff._sync.time.sleep", lambda seconds: None)
+    message = "Complexity budget exhausted, reset in 1 seconds"
+    groups = {"data": {"boards": [{"id": "1", "groups": [{"id": "topics"}]}]}}
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [{"json": {"errors": [{"message": message}]}}, {"json": groups}],
+    )
+    config = {**SAMPLE_CONFIG, "stream_responses": stream_responses}
+    stream = GroupsStream(tap=TapMonday(config=config))
+    records = list(stream.get_records({"board_id": 1}))
+
+    assert [record["id"] for record in records] == ["topics"]
+    assert requests_mock.call_count == 2
+
+
+def test_skip_unchanged_boards(
+    requests_mock, fixture_boards, fixture_groups, select_streams
+):
+    boards = fixture_boards["data"]["boards"]
+    boards.append({**boards[0], "id": "2389168663"})
+    groups_boards = fixture_groups["data"]["boards"]
+    groups_boards[0]["id"] = "2389168663"
+    config = {**SAMPLE_CONFIG, "skip_unchanged_boards": True}
+    catalog = select_streams(config, ("boards", "groups"))
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_boards, "status_code": 200},
+            {"json": fixture_groups, "status_code": 200},
+        ],
+    )
+    # The first board is unchanged, the second one was updated since
+    bookmarks = {"groups": {"2389168662": "2022-02-05T00:27:23Z"}}
+    state = {"bookmarks": {"boards": {"child_bookmarks": bookmarks}}}
+    tap = TapMonday(config=config, catalog=catalog, state=state)
+    records = []
+    tap.streams["groups"]._write_record_message = records.append
+    tap.streams["boards"].sync()
+
+    assert requests_mock.call_count == 2
+    assert requests_mock.request_history[1].json()["variables"] == {
+        "board_ids": 2389168663
+    }
+    assert {r["board_id"] for r in records} == {2389168663}
+    assert tap.state["bookmarks"]["boards"]["child_bookmarks"] == {
+        "groups": {
+            "2389168662": "2022-02-05T00:27:23Z",
+            "2389168663": "2022-02-05T00:27:23Z",
+        }
+    }
+
+
+def test_incremental_items(requests_mock, fixture_items):
+    item = fixture_items["data"]["boards"][0]["items"][0]
+    activity = {
+        "data": {
+            "boards": [
+                {
+                    "activity_logs": [
+                        {"data": json.dumps({"pulse_id": int(item["id"])})},
+                        {"data": json.dumps({"group_id": "topics"})},
+                    ]
+                }
+            ]
+        }
+    }
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": activity, "status_code": 200},
+            {"json": {"data": {"items": [item]}}, "status_code": 200},
+        ],
+    )
+    state = {
+        "bookmarks": {
+            "items": {
+                "partitions": [
+                    {
+                        "context": {"board_id": 2389168662},
+                        "replication_key": "updated_at",
+                        "replication_key_value": "2022-02-01T00:00:00Z",
+                    }
+                ]
+            }
+        }
+    }
+    config = {**SAMPLE_CONFIG, "incremental_items": True}
+    tap = TapMonday(config=config, state=state)
+    stream = ItemsStream(tap=tap)
+    records = list(stream.get_records({"board_id": 2389168662}))
+
+    assert [r["id"] for r in records] == [int(item["id"])]
+    assert requests_mock.request_history[0].json()["variables"] == {
+        "board_ids": 2389168662,
+        "from": "2022-02-01T00:00:00Z",
+        "limit": 500,
+        "page": 1,
+    }
+    assert requests_mock.request_history[1].json()["variables"] == {
+        "item_ids": [int(item["id"])],
+        "item_limit": 1,
+    }
+
+
+def test_request_metrics_retries(requests_mock, monkeypatch, fixture_boards):
+    monkeypatch.setattr("backoff._sync.time.sleep", lambda seconds: None)
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"status_code": 500},
+            {"json": fixture_boards, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config=SAMPLE_CONFIG)
+    list(BoardsStream(tap=tap).get_records(None))
+
+    summary = tap.request_metrics.summary()["boards"]
+    assert summary["requests"] == 1
+    assert summary["retries"] == 1
+    assert summary["backoff_seconds"] == 70
+    assert summary["records"] == 1
+
+
+@pytest.mark.parametrize("status_code, error", [(504, None), (200, "complexity")])
+def test_adaptive_board_limit_shrinks_on_error(
+    requests_mock, monkeypatch, fixture_boards, status_code, error
+):
+    monkeypatch.setattr("backoff._sync.time.sleep", lambda seconds: None)
+    sent = []
+    too_complex = {"errors": [{"message": "Query exceeds max complexity"}]}
+
+    def respond(status_code, body):
+        def callback(request, context):
+            payload = request.json()
+            sent.append(payload["variables"])
+            assert "complexity" in payload["query"]
+            context.status_code = status_code
+            return body
+
+        return callback
+
+    failed = too_complex if error else fixture_boards
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": respond(status_code, failed)},
+            {"json": respond(200, fixture_boards)},
+        ],
+    )
+    config = {**SAMPLE_CONFIG, "adaptive_board_limit": True, "board_limit": 8}
+    records = list(BoardsStream(tap=TapMonday(config=config)).get_records(None))
+
+    assert len(records) == 1
+    assert [(v["page"], v["board_limit"]) for v in sent] == [(1, 8), (1, 4)]
+
+
+def test_resume_interrupted_sync(
+    requests_mock, fixture_boards, fixture_groups, select_streams
+):
+    boards = fixture_boards["data"]["boards"]
+    boards.append({**boards[0], "id": "2389168663"})
+    second_groups = {"data": {"boards": [{"id": "2389168663", "groups": []}]}}
+    config = {**SAMPLE_CONFIG, "board_limit": 2, "resume_interrupted_sync": True}
+    catalog = select_streams(config, ("boards", "groups"))
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_boards, "status_code": 200},
+            {"json": fixture_groups, "status_code": 200},
+            {"status_code": 400},
+        ],
+    )
+    tap = TapMonday(config=config, catalog=catalog)
+    with pytest.raises(FatalAPIError):
+        tap.streams["boards"].sync()
+
+    state = tap.state
+    assert state["bookmarks"]["boards"]["checkpoint"] == {
+        "page": 1,
+        "completed_boards": [2389168662],
+    }
+
+    requests_mock.reset()
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [
+            {"json": fixture_boards, "status_code": 200},
+            {"json": second_groups, "status_code": 200},
+            {"json": {"data": {"boards": []}}, "status_code": 200},
+        ],
+    )
+    tap = TapMonday(config=config, catalog=catalog, state=state)
+    tap.streams["boards"].sync()
+
+    variables = [r.json()["variables"] for r in requests_mock.request_history]
+    assert variables[0]["page"] == 1
+    assert variables[1] == {"board_ids": 2389168663}
+    assert variables[2]["page"] == 2
+    assert "checkpoint" not in tap.state["bookmarks"]["boards"]
+
+
+def test_item_wide_column_clashing_with_item_field(requests_mock):
+    columns = {"data": {"boards": [{"id": "1", "columns": [{"id": "board_id"}]}]}}
+    item = {
+        "id": "5",
+        "board": {"id": "1"},
+        "column_values": [{"id": "board_id", "text": "Other board", "value": None}],
+    }
+    requests_mock.register_uri(
+        "POST",
+        SAMPLE_CONFIG["api_url"],
+        [{"json": columns}, {"json": {"data": {"items": [item]}}}],
+    )
+    tap = TapMonday(config={**SAMPLE_CONFIG, "item_wide_stream": True})
+    stream = tap.streams["item_wide"]
+    records = list(stream.get_records({"item_id": 5}))
+
+    assert "column_board_id" in stream.schema["properties"]
+    assert records[0]["board_id"] == 1
+    assert records[0]["column_board_id"] == "Other board"
+    assert records[0]["column_board_id_value"] == ""
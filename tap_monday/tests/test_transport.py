@@ -0,0 +1,35 @@
+"""Transport tests."""
+
+import socket
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tap_monday.transport import PooledHTTPAdapter
+
+
+def test_connect_timeout_added(monkeypatch):
+    timeouts = []
+
+    def send(self, request, stream, timeout, *args):
+        timeouts.append(timeout)
+        return requests.Response()
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    adapter = PooledHTTPAdapter(pool_size=4, connect_timeout=5)
+    request = requests.Request("POST", "https://api.monday.com/v2").prepare()
+    adapter.send(request, timeout=60)
+    adapter.send(request, timeout=(1, 2))
+
+    assert timeouts == [(5, 60), (1, 2)]
+
+
+def test_pool_options():
+    adapter = PooledHTTPAdapter(pool_size=4, connect_timeout=5, keepalive_seconds=30)
+    pool = adapter.poolmanager.connection_from_url("https://api.monday.com/v2")
+
+    assert pool.pool.maxsize == 4
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in pool.conn_kw["socket_options"]
+    assert PooledHTTPAdapter(4, 5).socket_options == [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    ]
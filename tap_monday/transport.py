@@ -0,0 +1,62 @@
+"""Connection pooling, keep-alive and timeouts of the API requests."""
+
+import socket
+from typing import Any, List, Mapping, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+Timeout = Union[None, float, Tuple[float, float], Tuple[float, None]]
+
+
+def keepalive_options(idle_seconds: int) -> List[Tuple[int, int, int]]:
+    """Return socket options probing connections idle for idle_seconds."""
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # Not every platform can tune the probes
+    for name, value in (
+        ("TCP_KEEPIDLE", idle_seconds),
+        ("TCP_KEEPINTVL", idle_seconds),
+        ("TCP_KEEPCNT", 3),
+    ):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """Adapter keeping up to pool_size connections per host open for reuse.
+
+    Requests with a single timeout get connect_timeout to connect and the
+    given timeout to read. With keepalive_seconds, idle pooled connections
+    are probed by TCP keep-alive, so dropped ones are noticed before reuse.
+    """
+
+    def __init__(
+        self, pool_size: int, connect_timeout: float, keepalive_seconds: int = 0
+    ) -> None:
+        """Initialize the pools, connections are opened as they are needed."""
+        self.connect_timeout = connect_timeout
+        self.socket_options = list(HTTPConnection.default_socket_options)
+        if keepalive_seconds:
+            self.socket_options += keepalive_options(keepalive_seconds)
+        super().__init__(pool_maxsize=pool_size)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        """Open the connections of the pools with the socket options."""
+        kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Timeout = None,
+        verify: Union[bool, str] = True,
+        cert: Any = None,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> requests.Response:
+        """Send a request, with the connect timeout if only a read one is set."""
+        if isinstance(timeout, (int, float)):
+            timeout = (self.connect_timeout, timeout)
+        return super().send(request, stream, timeout, verify, cert, proxies)